@@ -0,0 +1,138 @@
+# benchmark.py
+#
+# Offline throughput/latency/accuracy benchmark for the answering pipeline.
+# Replays a reproducible corpus of perturbed dataset questions (typos, slang)
+# through AnswerEngine, with a stub in place of the OpenAI fallback.
+#
+#   python benchmark.py --queries 500 --concurrency 1 4 16
+#   python benchmark.py --batch 32 --json bench.json
+
+import argparse
+import json
+import os
+import resource
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Keep benchmark traffic out of the real query log
+os.environ.setdefault("CRESCENT_QUERY_LOG", os.devnull)
+
+import numpy as np
+from dotenv import load_dotenv
+
+from utils.engine import AnswerEngine
+from utils.fallback import FallbackClient, StaticBackend
+from utils.metrics import metrics
+from utils.query_corpus import build_query_corpus
+
+load_dotenv()
+
+
+def _rss_mb():
+    """Current resident set size in MB (Linux), else peak RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _score(results, corpus):
+    """Accuracy against the labelled answers, and the share of queries sent to the fallback"""
+    correct = sum(r["response"].strip() == answer.strip() for r, (_, _, answer) in zip(results, corpus))
+    fallbacks = sum(r["route"] in ("fallback", "default") for r in results)
+    return correct / len(corpus), fallbacks / len(corpus)
+
+def run_level(engine, corpus, concurrency, batch_size=None):
+    """Replay the corpus with `concurrency` client threads; returns one report row"""
+    engine.cache.clear()
+    metrics.clear()
+    queries = [q for q, _, _ in corpus]
+    latencies = [0.0] * len(queries)
+
+    def one(i):
+        started = time.perf_counter()
+        result = engine.answer(queries[i])
+        latencies[i] = time.perf_counter() - started
+        return result
+
+    def chunk(start):
+        started = time.perf_counter()
+        results = engine.answer_batch(queries[start:start + batch_size])
+        latencies[start:start + batch_size] = [time.perf_counter() - started] * len(results)
+        return results
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if batch_size:
+            results = [r for part in pool.map(chunk, range(0, len(queries), batch_size)) for r in part]
+        else:
+            results = list(pool.map(one, range(len(queries))))
+    elapsed = time.perf_counter() - started
+
+    accuracy, fallback_rate = _score(results, corpus)
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "batch_size": batch_size or 1,
+        "qps": len(queries) / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "accuracy": accuracy,
+        "fallback_rate": fallback_rate,
+        "rss_mb": _rss_mb(),
+        "stages": metrics.summary()["stages"],
+    }
+
+def print_report(report):
+    print(f"\nLoad: {report['load_seconds']:.1f}s, RSS after load {report['rss_after_load_mb']:.0f} MB, "
+          f"{report['queries']} queries (seed {report['seed']})")
+    print(f"{'conc':>5} {'batch':>5} {'qps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'acc':>6} {'fallbk':>7} {'rss MB':>7}")
+    for row in report["levels"]:
+        print(f"{row['concurrency']:>5} {row['batch_size']:>5} {row['qps']:>9.1f} {row['p50_ms']:>8.2f} "
+              f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['accuracy']:>6.3f} {row['fallback_rate']:>7.3f} "
+              f"{row['rss_mb']:>7.0f}")
+    last = report["levels"][-1]["stages"]
+    if last:
+        print("\nPer-stage latency at the last level (ms):")
+        for stage, s in last.items():
+            print(f"  {stage:<22} n={s['count']:<6} p50={s['p50_ms']:<8} p95={s['p95_ms']:<8} p99={s['p99_ms']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Crescent answering pipeline offline")
+    parser.add_argument("--data", default="data/crescent_qa.json")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--batch", type=int, default=None, help="use answer_batch with this many queries per call")
+    parser.add_argument("--fallback-delay", type=float, default=0.05, help="stub fallback latency in seconds")
+    parser.add_argument("--index", default=None, help="index kind (see CRESCENT_INDEX_KIND)")
+    parser.add_argument("--json", default=None, help="also write the report to this file")
+    args = parser.parse_args()
+
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    engine = AnswerEngine.load(
+        data_path=args.data,
+        index_kind=args.index,
+        fallback=FallbackClient(StaticBackend(delay=args.fallback_delay)),
+    )
+    load_seconds = time.perf_counter() - started
+
+    corpus = build_query_corpus(engine.dataset, args.queries, args.seed)
+    report = {
+        "queries": len(corpus),
+        "seed": args.seed,
+        "load_seconds": load_seconds,
+        "rss_before_load_mb": rss_before,
+        "rss_after_load_mb": _rss_mb(),
+        "levels": [run_level(engine, corpus, c, args.batch) for c in args.concurrency],
+    }
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# evaluate.py
+#
+# Offline retrieval-quality evaluation and threshold tuning.
+# Builds a held-out paraphrase set from crescent_qa.json (questions rewritten
+# with typos and slang), runs it through preprocessing, exact match and vector
+# search, and reports top-1/top-k accuracy, MRR and precision/recall against
+# the score threshold, then recommends CRESCENT_MATCH_THRESHOLD and
+# CRESCENT_FALLBACK_THRESHOLD.
+#
+#   python evaluate.py --queries 1000 --max-error 0.05 --json eval.json
+
+import argparse
+import json
+import os
+
+os.environ.setdefault("CRESCENT_QUERY_LOG", os.devnull)
+
+import numpy as np
+from dotenv import load_dotenv
+
+from utils.engine import AnswerEngine, MATCH_THRESHOLD, FALLBACK_THRESHOLD
+from utils.fallback import FallbackClient, StaticBackend
+from utils.preprocess import preprocess_text
+from utils.question_index import exact_match
+from utils.query_corpus import build_query_corpus
+from utils.search import search_batch
+
+load_dotenv()
+
+THRESHOLDS = np.round(np.arange(0.30, 0.96, 0.01), 2)
+SEARCH_BATCH = 256
+
+
+def _answer_key(text):
+    return " ".join(str(text).lower().split())
+
+def retrieve(engine, corpus, top_k=5):
+    """
+    Run each query through preprocessing, exact match and vector search.
+    Returns per query: (best score, rank of the first correct answer or None, exact hit).
+    Rows with the same answer as the label count as correct.
+    """
+    answers = [_answer_key(a) for a in engine.dataset["answer"].tolist()]
+    outcomes = [None] * len(corpus)
+    pending = []
+    for i, (query, _, expected) in enumerate(corpus):
+        cleaned = preprocess_text(query)
+        row = exact_match(cleaned, engine.question_lookup)
+        if row is not None:
+            outcomes[i] = (1.0, 1 if answers[row] == _answer_key(expected) else None, True)
+        else:
+            pending.append((i, cleaned))
+
+    for start in range(0, len(pending), SEARCH_BATCH):
+        chunk = pending[start:start + SEARCH_BATCH]
+        found = search_batch([cleaned for _, cleaned in chunk], engine.model, engine.index, top_k)
+        for (i, _), (scores, ids) in zip(chunk, found):
+            expected = _answer_key(corpus[i][2])
+            rank = next((r + 1 for r, row in enumerate(ids) if row >= 0 and answers[int(row)] == expected), None)
+            outcomes[i] = (float(scores[0]) if len(scores) else 0.0, rank, False)
+    return outcomes
+
+def summarize(outcomes, top_k):
+    ranks = [rank for _, rank, _ in outcomes]
+    return {
+        "exact_match_rate": sum(exact for _, _, exact in outcomes) / len(outcomes),
+        "top1": sum(r == 1 for r in ranks) / len(ranks),
+        f"top{top_k}": sum(r is not None for r in ranks) / len(ranks),
+        "mrr": sum(1 / r for r in ranks if r) / len(ranks),
+    }
+
+def threshold_curve(outcomes, thresholds=THRESHOLDS):
+    """
+    For each threshold, over the queries that reach vector search (exact matches
+    bypass the thresholds): answered locally = top-1 score >= t.
+    precision = correct / answered, recall = correct answered / searched queries,
+    fallback_rate = share sent to the fallback, error_rate = wrong local answers / answered.
+    """
+    searched = [(score, rank) for score, rank, exact in outcomes if not exact]
+    if not searched:
+        return [{"threshold": float(t), "precision": 1.0, "recall": 0.0, "fallback_rate": 0.0, "error_rate": 0.0}
+                for t in thresholds]
+    scores = np.array([score for score, _ in searched])
+    correct = np.array([rank == 1 for _, rank in searched])
+    curve = []
+    for t in thresholds:
+        answered = scores >= t
+        n_answered = int(answered.sum())
+        n_correct = int((answered & correct).sum())
+        curve.append({
+            "threshold": float(t),
+            "precision": n_correct / n_answered if n_answered else 1.0,
+            "recall": n_correct / len(searched),
+            "fallback_rate": 1 - n_answered / len(searched),
+            "error_rate": (n_answered - n_correct) / n_answered if n_answered else 0.0,
+        })
+    return curve
+
+def recommend(curve, max_error=0.05):
+    """Lowest threshold (fewest fallbacks) whose wrong-answer rate stays within max_error"""
+    for point in curve:
+        if point["error_rate"] <= max_error:
+            return point
+    return curve[-1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality and tune score thresholds")
+    parser.add_argument("--data", default="data/crescent_qa.json")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--max-error", type=float, default=0.05, help="largest acceptable wrong-answer rate")
+    parser.add_argument("--index", default=None, help="index kind (see CRESCENT_INDEX_KIND)")
+    parser.add_argument("--json", default=None, help="also write the metrics and full curve to this file")
+    args = parser.parse_args()
+
+    engine = AnswerEngine.load(
+        data_path=args.data, index_kind=args.index, fallback=FallbackClient(StaticBackend()), micro_batch=False,
+    )
+    corpus = build_query_corpus(engine.dataset, args.queries, args.seed)
+    outcomes = retrieve(engine, corpus, args.top_k)
+    summary = summarize(outcomes, args.top_k)
+    curve = threshold_curve(outcomes)
+    best = recommend(curve, args.max_error)
+    current = next((p for p in curve if p["threshold"] >= round(FALLBACK_THRESHOLD, 2)), curve[-1])
+
+    print(f"{len(corpus)} paraphrased queries (seed {args.seed})")
+    print(f"top-1 {summary['top1']:.3f}   top-{args.top_k} {summary[f'top{args.top_k}']:.3f}   MRR {summary['mrr']:.3f}   "
+          f"exact matches {summary['exact_match_rate']:.3f}")
+    print(f"\nQueries reaching vector search:\n{'thresh':>6} {'prec':>6} {'recall':>6} {'fallbk':>6} {'error':>6}")
+    for point in curve[::5]:
+        print(f"{point['threshold']:>6.2f} {point['precision']:>6.3f} {point['recall']:>6.3f} "
+              f"{point['fallback_rate']:>6.3f} {point['error_rate']:>6.3f}")
+    print(f"\nCurrent fallback threshold {FALLBACK_THRESHOLD:.2f}: fallback rate {current['fallback_rate']:.3f}, "
+          f"error rate {current['error_rate']:.3f}")
+    print(f"Recommended (error rate <= {args.max_error:.2f}): fallback rate {best['fallback_rate']:.3f}, "
+          f"error rate {best['error_rate']:.3f}")
+    # Scores between the two thresholds go to the fallback anyway, so one cut-off serves both
+    print(f"  CRESCENT_MATCH_THRESHOLD={min(MATCH_THRESHOLD, best['threshold']):.2f}")
+    print(f"  CRESCENT_FALLBACK_THRESHOLD={best['threshold']:.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"queries": len(corpus), "seed": args.seed, **summary, "recommended": best, "curve": curve}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# server.py
+#
+# Headless HTTP/JSON API for the chatbot, for the mobile app, the WhatsApp gateway
+# and Streamlit (see CRESCENT_API_URL in web.py).
+#
+#   uvicorn server:app --host 0.0.0.0 --port 8000      # single process
+#   python server.py --processes 4                     # pre-forked workers sharing one model copy
+
+import argparse
+import asyncio
+import gc
+import os
+import signal
+import socket
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from utils.engine import AnswerEngine
+from utils.hot_reload import ReloadingEngine, open_engine
+from utils.metrics import metrics, start_log_dump
+
+load_dotenv()
+
+# Worker threads share one read-only engine (model, embeddings, index)
+WORKERS = int(os.getenv("CRESCENT_WORKERS", os.cpu_count() or 4))
+MAX_BATCH = int(os.getenv("CRESCENT_MAX_BATCH", 64))
+METRICS_LOG_INTERVAL = float(os.getenv("CRESCENT_METRICS_LOG_INTERVAL", 0))
+
+# Pre-fork supervisor: a worker exiting sooner than this after start counts as a crash
+MIN_WORKER_UPTIME = 10.0
+MAX_WORKER_CRASHES = 5
+
+executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="answer")
+engine: Optional[AnswerEngine | ReloadingEngine] = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global engine
+    # Pre-forked workers inherit an already loaded engine from serve()
+    if engine is None:
+        loop = asyncio.get_running_loop()
+        engine = await loop.run_in_executor(executor, open_engine)
+    start_log_dump(METRICS_LOG_INTERVAL)
+    yield
+
+
+app = FastAPI(title="Crescent University Chatbot API", lifespan=lifespan)
+
+
+class Query(BaseModel):
+    text: str
+    context: Optional[dict] = None
+
+
+class BatchQuery(BaseModel):
+    queries: list[Query]
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok" if engine is not None else "loading"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    # Per process: with pre-forked workers each scrape sees the worker that served it
+    return metrics.render()
+
+
+@app.post("/answer")
+async def answer(query: Query):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, engine.answer, query.text, query.context)
+
+
+@app.post("/answer/batch")
+async def answer_batch(batch: BatchQuery):
+    loop = asyncio.get_running_loop()
+    results = []
+    for start in range(0, len(batch.queries), MAX_BATCH):
+        chunk = batch.queries[start:start + MAX_BATCH]
+        results += await loop.run_in_executor(
+            executor,
+            engine.answer_batch,
+            [q.text for q in chunk],
+            [q.context for q in chunk],
+        )
+    return {"results": results}
+
+
+def serve(host="0.0.0.0", port=8000, processes=None):
+    """
+    Load the engine once, then fork worker processes that share it copy-on-write.
+    Embeddings (and persisted faiss indexes) are file mappings, so N workers keep
+    roughly one physical copy of the read-only data and of the model weights.
+    """
+    global engine
+    import torch
+    import uvicorn
+
+    processes = processes or os.cpu_count() or 1
+
+    # Keep the parent single-threaded in torch: an intra-op thread pool started
+    # before fork() is not inherited safely by the children
+    torch.set_num_threads(1)
+    # No background model load: worker processes fork from this one and would never see it finish
+    engine = open_engine(background_model=False)
+    # Move everything loaded so far out of the GC's reach, so collections in the
+    # children don't touch (and un-share) those pages
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    threads_per_worker = max(1, (os.cpu_count() or 1) // processes)
+    children = {}  # pid -> start time
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            # Children must not run the parent's supervisor signal handlers
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            exit_code = 1
+            try:
+                torch.set_num_threads(threads_per_worker)
+                uvicorn.Server(uvicorn.Config(app, log_level="info")).run(sockets=[sock])
+                exit_code = 0
+            finally:
+                # Never fall back into the supervisor loop in the child
+                os._exit(exit_code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(processes):
+        spawn()
+    print(f"Serving on {host}:{port} with {processes} worker processes")
+
+    # Replace workers that die until asked to stop. Workers that die quickly count
+    # as crashes; back off between them and give up after too many in a row.
+    crashes = 0
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if stopping:
+            continue
+        if started is not None and time.monotonic() - started < MIN_WORKER_UPTIME:
+            crashes += 1
+        else:
+            crashes = 0
+        if crashes > MAX_WORKER_CRASHES:
+            print(f"Worker crashed {crashes} times in a row at startup, shutting down")
+            stop(signal.SIGTERM, None)
+            continue
+        if crashes:
+            time.sleep(min(2 ** crashes, 30))
+        spawn()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crescent chatbot API with pre-forked workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--processes", type=int, default=int(os.getenv("CRESCENT_PROCESSES", 0)) or None)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.processes)
@@ -0,0 +1,56 @@
+import json
+import socket
+import urllib.error
+import urllib.request
+
+from utils.conversations import default_response
+
+
+def _error_result():
+    """Same shape as an AnswerEngine result, for when the server can't be reached"""
+    return {
+        "response": default_response(),
+        "route": "default",
+        "department": None,
+        "score": 0.0,
+        "related": [],
+        "query_info": None,
+    }
+
+
+class RemoteEngine:
+    """
+    Client for server.py exposing the same answer()/answer_batch() API as AnswerEngine.
+    Connection errors and timeouts are reported and answered with the default response,
+    so a UI never crashes because the API is down.
+    """
+
+    def __init__(self, base_url, timeout=15.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _post(self, path, payload):
+        request = urllib.request.Request(
+            f"{self.base_url}{path}",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except (urllib.error.URLError, socket.timeout, OSError, ValueError) as e:
+            print(f"Answer API request to {path} failed: {e}")
+            return None
+
+    def answer(self, text, context=None):
+        reply = self._post("/answer", {"text": text, "context": context})
+        return reply if reply is not None else _error_result()
+
+    def answer_batch(self, texts, contexts=None):
+        contexts = contexts or [None] * len(texts)
+        queries = [{"text": t, "context": c} for t, c in zip(texts, contexts)]
+        reply = self._post("/answer/batch", {"queries": queries})
+        if reply is None:
+            return [_error_result() for _ in texts]
+        return reply["results"]
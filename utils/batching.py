@@ -0,0 +1,104 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from utils.search import find_responses, search_batch
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-item calls into batched calls.
+    Items submitted within max_wait_ms of the first one in a batch (up to
+    max_batch_size) are handed to `handler` as one list; each caller gets back
+    its own result. `handler` must return one result per item, in order.
+    """
+
+    def __init__(self, handler, max_batch_size=32, max_wait_ms=5):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._closed = False
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, args=(self._queue,), name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        """Queue an item and return a Future for its result"""
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        if self._pid != os.getpid():
+            with self._lock:
+                # Threads don't survive fork(): a forked worker process starts its own
+                if self._pid != os.getpid():
+                    self._start()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout=None):
+        """Submit an item and block until its result is ready"""
+        return self.submit(item).result(timeout)
+
+    def close(self):
+        """Stop the worker after it drains queued items"""
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self, work_queue):
+        first = work_queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = work_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                # Put the sentinel back so the loop exits after this batch
+                work_queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self, work_queue):
+        while True:
+            batch = self._collect(work_queue)
+            if batch is None:
+                return
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                results = list(self.handler(items))
+                if len(results) != len(items):
+                    raise RuntimeError(f"MicroBatcher handler returned {len(results)} results for {len(items)} items")
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+def make_response_batcher(dataset, embeddings, model, index=None, threshold=0.6, top_k=4, cache=None, **batcher_kwargs):
+    """MicroBatcher whose calls behave like find_response(query, ...)"""
+    return MicroBatcher(
+        lambda queries: find_responses(queries, dataset, embeddings, model, threshold, index, top_k, cache),
+        **batcher_kwargs,
+    )
+
+def make_search_batcher(model, index, top_k=4, **batcher_kwargs):
+    """MicroBatcher whose calls return (scores, row_ids) for one query"""
+    return MicroBatcher(lambda queries: search_batch(queries, model, index, top_k), **batcher_kwargs)
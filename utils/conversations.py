@@ -1,10 +1,9 @@
 import random
-import re
 
 # --- Greeting Triggers ---
 GREETING_KEYWORDS = [
     "hello", "hi", "hey", "yo", "howdy", "hiya", "sup", "what's up",
-    "good morning", "good afternoon", "good evening", "greetings", "how are you"
+    "good morning", "good afternoon", "good evening", "greetings"
 ]
 
 GREETING_RESPONSES = [
@@ -71,10 +70,12 @@ SOCIAL_PATTERNS = {
 }
 
 # --- Detection + Response Functions ---
+# Detection goes through utils.intent_router, which compiles the keywords and
+# patterns above into one regex (imported lazily: the router imports this module)
 def is_greeting(text: str) -> bool:
-    """Check if the input text is a greeting."""
-    text = text.lower()
-    return any(re.search(rf"\b{re.escape(kw)}\b", text) for kw in GREETING_KEYWORDS)
+    """Check if the whole input text is a greeting."""
+    from utils.intent_router import route_intent
+    return route_intent(text)[0] == "greeting"
 
 def get_greeting_response() -> str:
     """Return a random greeting response."""
@@ -82,11 +83,11 @@ def get_greeting_response() -> str:
 
 def get_social_response(text: str) -> str | None:
     """Return a social/small-talk response if a pattern matches, else None."""
-    text = text.lower()
-    for pattern, responses in SOCIAL_PATTERNS.items():
-        if re.search(pattern, text):
-            return random.choice(responses)
-    return None
+    from utils.intent_router import route_intent
+    intent, slots = route_intent(text)
+    if intent != "social":
+        return None
+    return random.choice(SOCIAL_PATTERNS[slots["social"]])
 
 def default_response() -> str:
     """Fallback response when no greeting or social trigger is detected."""
@@ -1,6 +1,9 @@
-import json
 import re
 from rapidfuzz import process
+from rapidfuzz.distance import OSA
+
+from utils.phrase_matcher import PhraseMatcher
+from utils.dataset_loader import iter_records
 
 # 🔁 Informal input normalization map
 NORMALIZATION_MAP = {
@@ -34,12 +37,13 @@ DEPARTMENT_TO_FACULTY_MAP = {
     "physiology": "COHES", "architecture": "COES"
 }
 
+# ⚡ Compiled once at import for single-pass, whole-word matching
+NORMALIZATION_MATCHER = PhraseMatcher(NORMALIZATION_MAP)
+DEPARTMENT_MATCHER = PhraseMatcher({dept: dept for dept in DEPARTMENTS})
+
 # 🔤 Normalize slang/pidgin variants
 def normalize_text(text):
-    text = text.lower()
-    for slang, std in NORMALIZATION_MAP.items():
-        text = text.replace(slang, std)
-    return text
+    return NORMALIZATION_MATCHER.replace(text.lower())
 
 # 🔡 Fuzzy fallback for department match
 def fuzzy_match_department(text):
@@ -49,12 +53,11 @@ def fuzzy_match_department(text):
 # 🎯 Extract normalized department
 def normalize_department(text):
     norm_text = text.lower()
-    for slang, standard in NORMALIZATION_MAP.items():
-        if slang in norm_text and standard in DEPARTMENTS:
+    for _, standard in NORMALIZATION_MATCHER.find(norm_text):
+        if standard in DEPARTMENTS:
             return standard
-    for dept in DEPARTMENTS:
-        if dept in norm_text:
-            return dept
+    for _, dept in DEPARTMENT_MATCHER.find(norm_text):
+        return dept
     return fuzzy_match_department(text)
 
 # 📤 Extract structured course query
@@ -73,35 +76,248 @@ def extract_course_query(text):
 
 # 📂 Load course data
 def load_course_data(path="data/course_data.json"):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return list(iter_records(path))
+
+# 🔢 Course codes: "CSC 101", "CSC101", "CSC-101" and "CUAB-ARC 107" style variants.
+# Prefixes must be uppercase so "of 100 level" isn't read as a code.
+COURSE_CODE_PATTERN = re.compile(r"\b([A-Z]{2,4}(?:-[A-Z]{2,4})?)[\s-]?(\d{3})\b")
+
+def normalize_course_code(code):
+    """Canonical form of a course code: uppercase letters and digits only"""
+    return re.sub(r"[^A-Z0-9]", "", code.upper())
+
+def find_course_codes(text):
+    """Return all normalized course codes mentioned in text"""
+    return [normalize_course_code(prefix + number) for prefix, number in COURSE_CODE_PATTERN.findall(text or "")]
+
+def _entry_departments(value):
+    """Canonical department names for a catalog row ("Deparment of law (LL.B)" -> {"law"})"""
+    value = (value or "").lower()
+    if not value:
+        return set()
+    departments = {std for _, std in NORMALIZATION_MATCHER.find(value) if std in DEPARTMENTS}
+    departments.update(dept for _, dept in DEPARTMENT_MATCHER.find(value))
+    if not departments:
+        fuzzy = fuzzy_match_department(value)
+        if fuzzy:
+            departments.add(fuzzy)
+    return departments
+
+def _entry_levels(value):
+    """Levels covered by a row: "300" -> {"300"}, "200 level - 400level" -> {"200", "300", "400"}"""
+    numbers = [int(n) for n in re.findall(r"\d00", value or "")]
+    if len(numbers) == 2 and "-" in value:
+        return {str(n) for n in range(numbers[0], numbers[1] + 100, 100)}
+    return {str(n) for n in numbers}
+
+def _entry_semester(entry):
+    semester = (entry.get("semester") or "").lower()
+    if semester in ("first", "second"):
+        return semester
+    match = re.search(r"\b(first|second)\s*semester\b", entry.get("question", "").lower())
+    return match.group(1) if match else None
+
+class CourseCatalog:
+    """
+    Course data with hash indexes built once at load time:
+    (department, level, semester) -> rows, where level/semester may be None as a wildcard,
+    and normalized course code -> rows asking about (or, failing that, mentioning) that code.
+    """
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        self.by_query = {}
+        self.by_code = {}
+        self.by_code_mention = {}
+
+        for entry in self.entries:
+            semester = _entry_semester(entry)
+            for dept in _entry_departments(entry.get("department")):
+                for level in _entry_levels(entry.get("level")) | {None}:
+                    for sem in {semester, None}:
+                        self.by_query.setdefault((dept, level, sem), []).append(entry)
+
+            for code in dict.fromkeys(find_course_codes(entry.get("question"))):
+                self.by_code.setdefault(code, []).append(entry)
+            for code in dict.fromkeys(find_course_codes(entry.get("answer"))):
+                self.by_code_mention.setdefault(code, []).append(entry)
+
+    @classmethod
+    def from_file(cls, path="data/course_data.json"):
+        return cls(load_course_data(path))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def find(self, department, level=None, semester=None):
+        """All rows for a department, optionally narrowed to a level and/or semester"""
+        if not department:
+            return []
+        dept = department.lower()
+        if dept not in DEPARTMENTS:
+            dept = normalize_department(dept)
+        key = (dept, str(level).lower() if level else None, semester.lower() if semester else None)
+        return self.by_query.get(key, [])
+
+    def get_by_code(self, code):
+        """Rows about a course code in any spelling variant, else rows whose answer mentions it"""
+        code = normalize_course_code(code)
+        return self.by_code.get(code) or self.by_code_mention.get(code, [])
+
+# 🔎 Course-code index: one record per code, parsed from course listings and
+# course-code answers, with typo-tolerant lookup
+_CODE = r"[A-Za-z]{2,4}(?:-[A-Za-z]{2,4})?[\s-]?\d{3}"
+# "General Biology I (BIO 101) Unit:3 | ..."
+COURSE_LISTING_RE = re.compile(
+    rf"^\s*(?P<title>[^|()]+?(?:\([^)]*\)[^|()]*?)?)\s*\(\s*(?P<code>{_CODE})\s*\)"
+    r"\s*(?:U[nm]its?\s*:?\s*(?P<units>\d+))?"
+)
+# "BIO 101 is General Biology I, a 3 Unit course offered by Anatomy, Nursing in 100 level first semester."
+COURSE_SENTENCE_RE = re.compile(
+    rf"^(?P<code>{_CODE}) is (?P<title>.+?), a (?:(?P<units>\d+) Units? )?course offered by (?P<departments>.+?)"
+    r" in (?P<level>\d00) level(?: (?P<semester>first|second) semester)?", re.IGNORECASE
+)
+# "The course code for Communication in English is GST 111."
+COURSE_CODE_ANSWER_RE = re.compile(rf"^The course code for (?P<title>.+?) is (?P<code>{_CODE})\.?$", re.IGNORECASE)
+# Any-case code candidates in user text; lowercase ones only count when they name a known code
+CODE_CANDIDATE_RE = re.compile(r"\b([A-Za-z]{2,4}(?:-[A-Za-z]{2,4})?)[\s-]?(\d{3})\b")
+MAX_CODE_DISTANCE = 1
+
+def display_course_code(code):
+    """ "cuab-acc103" -> "CUAB-ACC 103" """
+    match = re.match(r"^([A-Z]+(?:-[A-Z]+)?)[\s-]*(\d{3})$", code.upper().strip())
+    return f"{match.group(1)} {match.group(2)}" if match else code.upper()
+
+def _parse_courses(entry):
+    """Yield one partial course record per code a row lists or defines"""
+    answer = str(entry.get("answer", "")).strip()
+    semester = _entry_semester(entry)
+    departments = _entry_departments(entry.get("department"))
+    for segment in answer.split("|"):
+        match = COURSE_LISTING_RE.match(segment)
+        if match:
+            yield match.group("code"), match.group("title"), match.group("units"), semester, departments
+    match = COURSE_SENTENCE_RE.match(answer)
+    if match:
+        yield (match.group("code"), match.group("title"), match.group("units"), match.group("semester"),
+               _entry_departments(match.group("departments")))
+    match = COURSE_CODE_ANSWER_RE.match(answer)
+    if match:
+        yield match.group("code"), match.group("title"), None, semester, departments
+
+def _deletes(code, distance):
+    """All strings reachable from code by deleting up to `distance` characters (SymSpell style)"""
+    found = {code}
+    frontier = {code}
+    for _ in range(distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        found |= frontier
+    return found
+
+class CourseCodeIndex:
+    """
+    Normalized course code -> {"code", "title", "units", "level", "semester", "departments"},
+    merged across every row that lists or defines the code.
+    Exact lookups are one dict access. Fuzzy lookups use a deletion-neighbourhood
+    index, so finding every code within `max_distance` edits (a typo or a swapped
+    pair of characters) touches a handful of candidates, not the whole list.
+    """
+
+    def __init__(self, entries, max_distance=MAX_CODE_DISTANCE):
+        self.max_distance = max_distance
+        self.records = {}
+        for entry in entries:
+            for raw_code, title, units, semester, departments in _parse_courses(entry):
+                code = normalize_course_code(raw_code)
+                record = self.records.setdefault(code, {
+                    "code": display_course_code(raw_code),
+                    "title": " ".join(title.split()).strip(" -:,"),
+                    "units": None,
+                    "level": f"{code[-3]}00",
+                    "semester": None,
+                    "departments": set(),
+                })
+                record["units"] = record["units"] or (int(units) if units else None)
+                record["semester"] = record["semester"] or (semester.capitalize() if semester else None)
+                record["departments"] |= departments
+        self.prefixes = {re.match(r"[A-Z]+", code).group() for code in self.records}
+        self._neighbours = {}
+        for code in self.records:
+            for variant in _deletes(code, max_distance):
+                self._neighbours.setdefault(variant, set()).add(code)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, code):
+        return normalize_course_code(code) in self.records
+
+    def get(self, code):
+        """Record for a code in any spelling variant ("CSC 101", "csc101", "CSC-101"), or None"""
+        return self.records.get(normalize_course_code(code))
+
+    def closest(self, code):
+        """Records within max_distance edits of code, nearest first"""
+        code = normalize_course_code(code)
+        candidates = set()
+        for variant in _deletes(code, self.max_distance):
+            candidates |= self._neighbours.get(variant, set())
+        scored = sorted((OSA.distance(code, other), other) for other in candidates)
+        return [self.records[other] for distance, other in scored if distance <= self.max_distance]
+
+    def find_in_text(self, text):
+        """
+        Codes mentioned in text, as (normalized code, records, exact) tuples.
+        Uppercase codes and codes with a known prefix ("csc 11") also get fuzzy
+        matches; other lowercase words followed by a number ("of 100 level") are ignored.
+        """
+        found = []
+        for prefix, number in CODE_CANDIDATE_RE.findall(text or ""):
+            code = normalize_course_code(prefix + number)
+            record = self.records.get(code)
+            if record is not None:
+                found.append((code, [record], True))
+            elif prefix.isupper() or re.sub(r"[^A-Z]", "", prefix.upper()) in self.prefixes:
+                records = self.closest(code)
+                if records:
+                    found.append((code, records, False))
+        return found
+
+def format_course(record):
+    """One-line description of a course-code record"""
+    details = [f"{record['units']} units" if record["units"] else None, f"{record['level']} level"]
+    if record["semester"]:
+        details.append(f"{record['semester']} semester")
+    text = f"*{record['code']}* — {record['title']} ({', '.join(d for d in details if d)})"
+    if record["departments"]:
+        text += f"\nOffered in: {', '.join(sorted(d.title() for d in record['departments']))}"
+    return text
+
+# Catalog for the most recently seen raw course list, so callers passing a list don't rebuild it per query
+_default_catalog = (None, None)
+
+def _catalog_for(course_data):
+    global _default_catalog
+    if isinstance(course_data, CourseCatalog):
+        return course_data
+    cached_data, cached_catalog = _default_catalog
+    if cached_data is not course_data:
+        _default_catalog = (course_data, CourseCatalog(course_data))
+    return _default_catalog[1]
 
 # 🧾 Return specific course results for query
 def get_courses_for_query(query_info, course_data):
+    """
+    Answer a structured course query from a CourseCatalog (or a raw course list).
+    Returns the answers of all matching entries, or None.
+    """
     if not query_info:
         return None
 
-    dept = query_info.get("department", "").lower()
-    level = query_info.get("level", "").lower() if query_info.get("level") else None
-    semester = query_info.get("semester", "").lower() if query_info.get("semester") else None
-
-    matches = []
-    for entry in course_data:
-        try:
-            if entry["department"].lower() != dept:
-                continue
-            if level and entry.get("level", "").lower() != level:
-                continue
-            if semester and semester not in entry.get("question", "").lower():
-                continue
-            matches.append(entry)
-        except KeyError:
-            continue
-
+    catalog = _catalog_for(course_data)
+    matches = catalog.find(query_info.get("department"), query_info.get("level"), query_info.get("semester"))
     if not matches:
         return None
-    if len(matches) == 1:
-        return matches[0]["answer"]
-    else:
-        # 🛑 Only return one relevant answer (avoid dumping all results)
-        return matches[0]["answer"]
+
+    answers = dict.fromkeys(entry["answer"] for entry in matches)
+    return "\n\n".join(answers)
@@ -0,0 +1,132 @@
+import glob
+import json
+import os
+import pandas as pd
+
+# Knowledge-base row schema: required text fields and optional metadata
+REQUIRED_FIELDS = ("question", "answer")
+OPTIONAL_FIELDS = ("topic", "department", "faculty", "level", "semester")
+COLUMNS = REQUIRED_FIELDS + OPTIONAL_FIELDS
+
+READ_CHUNK_SIZE = 1 << 16
+
+# Only the first few rejected rows are printed; the rest are counted
+MAX_REPORTED_ERRORS = 5
+
+
+def _iter_json_array(f, chunk_size=READ_CHUNK_SIZE):
+    """Yield the items of a top-level JSON array one at a time, reading the file in chunks"""
+    decoder = json.JSONDecoder()
+    buffer, eof, started = "", False, False
+    while True:
+        buffer = buffer.lstrip()
+        if not started and buffer:
+            if buffer[0] != "[":
+                raise ValueError("expected a JSON array of records")
+            buffer, started = buffer[1:].lstrip(), True
+        if started and buffer.startswith(","):
+            buffer = buffer[1:].lstrip()
+        if started and buffer.startswith("]"):
+            return
+        if started and buffer:
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # Item continues in the next chunk
+                if eof:
+                    raise
+            else:
+                yield item
+                buffer = buffer[end:]
+                continue
+        if eof:
+            raise ValueError("unexpected end of JSON array")
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+def _iter_file(path):
+    """Yield (location, record) for every record of a .json array or .jsonl file"""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield f"{path}:{line_no}", json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield f"{path}:{line_no}", e
+        else:
+            for item_no, item in enumerate(_iter_json_array(f), 1):
+                yield f"{path}[{item_no}]", item
+
+def _resolve_paths(source):
+    """A file, a directory of shards, a glob pattern, or a list of any of these"""
+    if isinstance(source, (list, tuple)):
+        return [p for s in source for p in _resolve_paths(s)]
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, name)
+            for name in os.listdir(source)
+            if name.endswith((".json", ".jsonl", ".ndjson"))
+        )
+    if glob.has_magic(source):
+        return sorted(glob.glob(source))
+    return [source]
+
+def validate_record(record):
+    """
+    Return the record restricted to the schema with text fields as stripped strings,
+    or raise ValueError naming the problem.
+    """
+    if not isinstance(record, dict):
+        raise ValueError(f"expected an object, got {type(record).__name__}")
+    row = {}
+    for field in COLUMNS:
+        value = record.get(field)
+        if value is None:
+            value = ""
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        elif not isinstance(value, str):
+            raise ValueError(f"field '{field}' must be a string, got {type(value).__name__}")
+        row[field] = value.strip()
+    for field in REQUIRED_FIELDS:
+        if not row[field]:
+            raise ValueError(f"missing '{field}'")
+    return row
+
+def _dedupe_key(row):
+    return " ".join(row["question"].lower().split()), " ".join(row["answer"].lower().split())
+
+def iter_records(source, dedupe=True):
+    """
+    Stream validated, de-duplicated knowledge-base rows from JSON/JSONL files or shards.
+    Invalid rows are skipped and reported; exact duplicate question/answer pairs are dropped.
+    """
+    seen = set()
+    rejected = duplicates = 0
+    for path in _resolve_paths(source):
+        for location, record in _iter_file(path):
+            try:
+                if isinstance(record, Exception):
+                    raise ValueError(f"invalid JSON: {record}")
+                row = validate_record(record)
+            except ValueError as e:
+                rejected += 1
+                if rejected <= MAX_REPORTED_ERRORS:
+                    print(f"Skipping {location}: {e}")
+                continue
+            if dedupe:
+                key = _dedupe_key(row)
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+            yield row
+    if rejected or duplicates:
+        print(f"Loaded {source}: skipped {rejected} invalid and {duplicates} duplicate rows")
+
+def load_records(source, dedupe=True):
+    """All validated rows of a source as a DataFrame with the schema's columns"""
+    return pd.DataFrame(list(iter_records(source, dedupe)), columns=list(COLUMNS))
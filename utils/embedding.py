@@ -1,17 +1,19 @@
-import json
-import pandas as pd
-from sentence_transformers import SentenceTransformer
 import torch
 
-def load_model(model_name="all-MiniLM-L6-v2"):
-    """Load SentenceTransformer model"""
-    return SentenceTransformer(model_name)
+from utils.model_registry import MODEL_NAME, get_model
+from utils.dataset_loader import load_records
+
+def load_model(model_name=MODEL_NAME):
+    """Return the shared, warmed-up SentenceTransformer model"""
+    return get_model(model_name)
 
 def load_dataset(path="data/crescent_qa.json"):
-    """Load Q&A dataset from JSON into pandas DataFrame"""
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return pd.DataFrame(data)
+    """
+    Load the Q&A dataset into a pandas DataFrame.
+    path may be a JSON array, a JSONL file, a directory of shards or a glob;
+    rows are streamed, validated and de-duplicated (see utils.dataset_loader).
+    """
+    return load_records(path)
 
 def compute_question_embeddings(questions, model):
     """Compute sentence embeddings for a list of questions"""
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+import torch
+
+from utils.embedding import MODEL_NAME
+
+CACHE_DIR = "data/cache"
+
+# Rows encoded per model call when (re)building the cache
+ENCODE_CHUNK_SIZE = 4096
+
+def _row_hash(question):
+    """Stable hash of a single question's text"""
+    return hashlib.sha1(str(question).encode("utf-8")).hexdigest()
+
+def dataset_hash(row_hashes, model_name=MODEL_NAME):
+    """Content hash of the whole question list for a given model"""
+    digest = hashlib.sha1(model_name.encode("utf-8"))
+    for h in row_hashes:
+        digest.update(h.encode("ascii"))
+    return digest.hexdigest()
+
+def cache_key(questions, model_name=MODEL_NAME):
+    """Content hash identifying a question list encoded with a given model"""
+    return dataset_hash([_row_hash(q) for q in questions], model_name)
+
+def _stem(model_name):
+    return model_name.replace("/", "__")
+
+def cache_paths(key, model_name=MODEL_NAME, cache_dir=CACHE_DIR):
+    """
+    Return (vectors_path, hashes_path) for one dataset version.
+    Both files are named by the dataset hash, so a vectors file can never be
+    paired with another version's row hashes.
+    """
+    base = os.path.join(cache_dir, f"{_stem(model_name)}-{key}")
+    return f"{base}.npy", f"{base}.json"
+
+def _latest_path(model_name, cache_dir):
+    """Small pointer file naming the most recently written dataset hash"""
+    return os.path.join(cache_dir, f"{_stem(model_name)}.latest.json")
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_atomic(path, write):
+    """Write via a unique temp file in the same directory, then rename over path"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _load_version(key, model_name, cache_dir):
+    """
+    Load one cached dataset version as (row_hashes, vectors), or None.
+    The row hashes must hash back to the key and match the vector count.
+    """
+    vectors_path, hashes_path = cache_paths(key, model_name, cache_dir)
+    meta = _read_json(hashes_path)
+    if not meta or meta.get("model") != model_name:
+        return None
+    row_hashes = meta.get("row_hashes") or []
+    if dataset_hash(row_hashes, model_name) != key:
+        return None
+    try:
+        # Copy-on-write mapping: pages are shared with the file until written
+        vectors = np.load(vectors_path, mmap_mode="c")
+    except (OSError, ValueError):
+        return None
+    if vectors.ndim != 2 or len(vectors) != len(row_hashes):
+        return None
+    return row_hashes, vectors
+
+def _remove_stale_versions(key, model_name, cache_dir):
+    prefix = f"{_stem(model_name)}-"
+    keep = {os.path.basename(p) for p in cache_paths(key, model_name, cache_dir)}
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix) and name.endswith((".npy", ".json")) and name not in keep:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+
+def is_cached(questions, model_name=MODEL_NAME, cache_dir=CACHE_DIR):
+    """True when embeddings for exactly these questions are already on disk"""
+    return _load_version(cache_key(questions, model_name), model_name, cache_dir) is not None
+
+def load_or_compute_embeddings(questions, model, model_name=MODEL_NAME, cache_dir=CACHE_DIR):
+    """
+    Load question embeddings from the on-disk cache, re-encoding only new or changed rows.
+    The cache is keyed on a content hash of the questions and the model name, so an
+    unchanged dataset is memory-mapped straight from disk without touching the model.
+    Returns: float32 torch tensor of shape (len(questions), dim)
+    """
+    questions = list(questions)
+    if not questions:
+        return torch.empty((0, 0), dtype=torch.float32)
+    row_hashes = [_row_hash(q) for q in questions]
+    key = dataset_hash(row_hashes, model_name)
+
+    current = _load_version(key, model_name, cache_dir)
+    if current is not None:
+        return torch.from_numpy(current[1])
+
+    # Reuse rows of the latest cached version whose question text is unchanged
+    previous, cached = {}, None
+    latest = _read_json(_latest_path(model_name, cache_dir))
+    if latest and latest.get("dataset_hash"):
+        loaded = _load_version(latest["dataset_hash"], model_name, cache_dir)
+        if loaded is not None:
+            old_hashes, cached = loaded
+            previous = {h: i for i, h in enumerate(old_hashes)}
+
+    missing = [i for i, h in enumerate(row_hashes) if h not in previous]
+    reused = [(i, previous[h]) for i, h in enumerate(row_hashes) if h in previous]
+
+    os.makedirs(cache_dir, exist_ok=True)
+    vectors_path, hashes_path = cache_paths(key, model_name, cache_dir)
+
+    # Encode missing rows in chunks straight into an on-disk array, so peak memory
+    # stays at one chunk however large the corpus is
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    os.close(fd)
+    vectors = None
+    try:
+        for start in range(0, max(len(missing), 1), ENCODE_CHUNK_SIZE):
+            rows = missing[start:start + ENCODE_CHUNK_SIZE]
+            encoded = None
+            if rows:
+                encoded = model.encode(
+                    [questions[i] for i in rows],
+                    convert_to_numpy=True,
+                    show_progress_bar=len(missing) > 100,
+                ).astype(np.float32)
+            if vectors is None:
+                dim = encoded.shape[1] if encoded is not None else cached.shape[1]
+                vectors = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(len(questions), dim))
+            if rows:
+                vectors[rows] = encoded
+        for start in range(0, len(reused), ENCODE_CHUNK_SIZE):
+            new_rows, old_rows = zip(*reused[start:start + ENCODE_CHUNK_SIZE])
+            vectors[list(new_rows)] = cached[list(old_rows)]
+        vectors.flush()
+        del vectors
+        os.replace(tmp_path, vectors_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    meta = {"model": model_name, "dataset_hash": key, "dim": int(dim), "rows": len(questions), "row_hashes": row_hashes}
+    _write_atomic(hashes_path, lambda f: f.write(json.dumps(meta).encode("utf-8")))
+    _write_atomic(
+        _latest_path(model_name, cache_dir),
+        lambda f: f.write(json.dumps({"model": model_name, "dataset_hash": key}).encode("utf-8")),
+    )
+    _remove_stale_versions(key, model_name, cache_dir)
+
+    # Serve from the file mapping so every process maps the same physical pages
+    return torch.from_numpy(np.load(vectors_path, mmap_mode="c"))
@@ -0,0 +1,380 @@
+import os
+import threading
+import time
+
+from utils.embedding import load_dataset
+from utils.embedding_cache import load_or_compute_embeddings, cache_key, is_cached
+from utils.model_registry import MODEL_NAME, get_model, release_model, encoder_backend, verify_encoder
+from utils.vector_index import build_index
+from utils.question_index import build_question_index, exact_match
+from utils.preprocess import preprocess_text
+from utils.search import find_responses, lexical_responses
+from utils.lexical_index import BM25Index
+from utils.partitions import MetadataPartitions, normalize_filters
+from utils.reranker import make_reranker
+from utils.batching import MicroBatcher
+from utils.response_cache import ResponseCache
+from utils.fallback import FallbackClient, FALLBACK_NOTE
+from utils.log_utils import log_query
+from utils.metrics import span, record_answer, record_cache_lookup
+from utils.course_query import (
+    CourseCatalog,
+    CourseCodeIndex,
+    display_course_code,
+    extract_course_query,
+    format_course,
+    get_courses_for_query,
+)
+from utils.conversations import (
+    get_greeting_response,
+    get_social_response,
+    default_response,
+)
+from utils.intent_router import is_follow_up, route_intent
+
+# Below MATCH_THRESHOLD search finds nothing; below FALLBACK_THRESHOLD the GPT fallback is asked.
+# Tune both with evaluate.py
+MATCH_THRESHOLD = float(os.getenv("CRESCENT_MATCH_THRESHOLD", 0.6))
+FALLBACK_THRESHOLD = float(os.getenv("CRESCENT_FALLBACK_THRESHOLD", 0.65))
+
+# Hybrid retrieval: fuse BM25 hits with vector hits (see search._fuse)
+HYBRID = os.getenv("CRESCENT_HYBRID", "1").lower() not in ("0", "false", "no")
+FUSION = os.getenv("CRESCENT_FUSION", "weighted")
+LEXICAL_WEIGHT = float(os.getenv("CRESCENT_LEXICAL_WEIGHT", 0.5))
+
+# Search only the department/faculty/level slice a query or its follow-up context pins
+PARTITIONED_SEARCH = os.getenv("CRESCENT_PARTITIONED_SEARCH", "1").lower() not in ("0", "false", "no")
+
+# Load the encoder in the background and answer lexically until it is ready
+BACKGROUND_MODEL_LOAD = os.getenv("CRESCENT_BACKGROUND_MODEL_LOAD", "0").lower() in ("1", "true", "yes")
+
+def update_query_context(follow_up, last_query):
+    """Carry the previous course query forward, overriding level/semester named in the follow-up"""
+    q = dict(last_query)
+    _, slots = route_intent(follow_up)
+    for key in ("level", "semester"):
+        if slots.get(key):
+            q[key] = slots[key]
+    return q
+
+def _clean_department(value):
+    return value if isinstance(value, str) and value.strip() else None
+
+def _new_result(response="", route=None, query_info=None):
+    return {
+        "response": response,
+        "route": route,
+        "department": query_info.get("department") if query_info else None,
+        "score": 0.0,
+        "related": [],
+        "query_info": query_info,
+    }
+
+
+class AnswerEngine:
+    """
+    The chatbot's answering pipeline, independent of any UI:
+    greeting / small talk -> course code / course catalog lookup ->
+    exact match -> semantic search -> GPT fallback.
+    All loaded state is read-only after construction, so one engine can be
+    shared by every Streamlit session or HTTP worker thread in a process.
+    """
+
+    def __init__(self, dataset, embeddings, model, index=None, question_lookup=None, catalog=None,
+                 fallback=None, cache=None, match_threshold=None, fallback_threshold=None, micro_batch=True,
+                 lexical=None, hybrid=None, fusion=None, lexical_weight=None, partitions=None, partitioned=None,
+                 reranker=None, course_codes=None):
+        self.dataset = dataset
+        self.embeddings = embeddings
+        # None while a background load is in progress; searches are lexical until then
+        self.model = model
+        self.index = index
+        questions, answers = dataset["question"].tolist(), dataset["answer"].tolist()
+        if question_lookup is None:
+            question_lookup = build_question_index(questions, answers)
+        self.question_lookup = question_lookup
+        if lexical is None and (HYBRID if hybrid is None else hybrid):
+            lexical = BM25Index(questions, answers)
+        self.lexical = lexical
+        self.fusion = fusion or FUSION
+        self.lexical_weight = LEXICAL_WEIGHT if lexical_weight is None else lexical_weight
+        if partitions is None and (PARTITIONED_SEARCH if partitioned is None else partitioned):
+            partitions = MetadataPartitions(dataset, embeddings)
+        self.partitions = partitions
+        # None builds the CRESCENT_RERANKER one; False turns reranking off
+        self.reranker = make_reranker() if reranker is None else (reranker or None)
+        self.catalog = catalog
+        if course_codes is None:
+            course_codes = CourseCodeIndex((catalog.entries if catalog is not None else []) + dataset.to_dict("records"))
+        self.course_codes = course_codes
+        self.fallback = fallback if fallback is not None else FallbackClient()
+        self.cache = cache if cache is not None else ResponseCache()
+        self.match_threshold = MATCH_THRESHOLD if match_threshold is None else match_threshold
+        self.fallback_threshold = FALLBACK_THRESHOLD if fallback_threshold is None else fallback_threshold
+        # Coalesces concurrent answer() calls from different sessions/threads into one search
+        self._batcher = MicroBatcher(self._search) if micro_batch else None
+
+    @classmethod
+    def load(cls, data_path="data/crescent_qa.json", model_name=MODEL_NAME, index_kind=None,
+             course_data_path="data/course_data.json", encoder=None, background_model=None, **kwargs):
+        """
+        Load model, dataset, cached embeddings, index and course catalog, and build an engine.
+        encoder (or CRESCENT_ENCODER_BACKEND) picks the query encoder backend; see model_registry.
+        With background_model (or CRESCENT_BACKGROUND_MODEL_LOAD) and a warm embedding cache,
+        the engine is returned before the encoder has loaded and answers lexically meanwhile.
+        """
+        backend = encoder or encoder_backend()
+        dataset = load_dataset(data_path)
+        questions = dataset["question"].tolist()
+        background = BACKGROUND_MODEL_LOAD if background_model is None else background_model
+        if background and is_cached(questions, model_name):
+            embeddings = load_or_compute_embeddings(questions, None, model_name=model_name)
+            engine = cls._build(dataset, embeddings, None, questions, model_name, index_kind, course_data_path, kwargs)
+            threading.Thread(
+                target=engine._load_model, args=(model_name, backend, questions), name="model-loader", daemon=True,
+            ).start()
+            return engine
+
+        model = get_model(model_name, backend=backend)
+
+        # Corpus vectors stay float32 reference embeddings: encode a cold corpus with the torch model
+        use_reference = backend != "torch" and not is_cached(questions, model_name)
+        corpus_model = get_model(model_name, warmup=False, backend="torch") if use_reference else model
+        embeddings = load_or_compute_embeddings(questions, corpus_model, model_name=model_name)
+        if use_reference:
+            release_model(model_name, "torch")
+        model = verify_encoder(model, questions, embeddings, model_name, backend)
+        return cls._build(dataset, embeddings, model, questions, model_name, index_kind, course_data_path, kwargs)
+
+    @classmethod
+    def _build(cls, dataset, embeddings, model, questions, model_name, index_kind, course_data_path, kwargs):
+        index = build_index(
+            embeddings,
+            kind=index_kind or os.getenv("CRESCENT_INDEX_KIND", "auto"),
+            cache_key=cache_key(questions, model_name),
+        )
+        catalog = CourseCatalog.from_file(course_data_path) if course_data_path and os.path.exists(course_data_path) else None
+        return cls(dataset, embeddings, model, index=index, catalog=catalog, **kwargs)
+
+    def _load_model(self, model_name, backend, questions):
+        try:
+            model = get_model(model_name, backend=backend)
+            self.model = verify_encoder(model, questions, self.embeddings, model_name, backend)
+        except Exception as e:
+            print(f"Background model load failed, loading on first search instead: {e}")
+            self.model = get_model(model_name, backend="torch")
+
+    # --- Routing ---
+    def _route(self, text, context):
+        """
+        Answer what can be answered without semantic search.
+        Returns (result, None) when done, or (partial result, cleaned query) when a search is needed.
+        """
+        with span("intent"):
+            intent, slots = route_intent(text)
+        if intent == "greeting":
+            return _new_result(get_greeting_response(), "greeting"), None
+        if intent == "social":
+            return _new_result(get_social_response(text), "social"), None
+        # "hi, what are the fees?" is a question: drop the greeting and answer it
+        text = slots["text"].strip() or text
+
+        with span("course_lookup"):
+            routed = self._route_course(text, context)
+        if routed is not None:
+            return routed, None
+
+        with span("extract_course_query"):
+            result = _new_result(query_info=extract_course_query(text))
+
+        # If follow-up, enrich query with memory
+        if context and is_follow_up(text):
+            enriched = f"{text} in {context.get('department') or ''}"
+            if context.get("level") and "level" not in text:
+                enriched += f" {context['level']} level"
+            if context.get("semester") and "semester" not in text:
+                enriched += f", {context['semester']} semester"
+            with span("preprocess"):
+                cleaned = preprocess_text(enriched)
+        else:
+            with span("preprocess"):
+                cleaned = preprocess_text(text)
+
+        with span("exact_match"):
+            matched_idx = exact_match(cleaned, self.question_lookup)
+        if matched_idx is not None:
+            result.update(response=self.dataset.iloc[matched_idx]["answer"], route="exact", score=1.0)
+            return result, None
+        return result, cleaned
+
+    def _route_code(self, text):
+        """Answer a course code ("CSC 101", "csc101", "CSC-101") from the code index, or suggest near misses"""
+        found = self.course_codes.find_in_text(text)
+        # A code the index knows beats a near miss elsewhere in the message
+        for code, records, exact in sorted(found, key=lambda hit: not hit[2]):
+            if exact:
+                rows = self.catalog.by_code.get(code, []) if self.catalog is not None else []
+                info = "\n\n".join(dict.fromkeys(entry["answer"] for entry in rows)) or format_course(records[0])
+                result = _new_result(f"📘 *Here’s the info for* `{records[0]['code']}`:\n\n{info}", "course_code")
+                result["score"] = 1.0
+                return result
+            suggestions = "\n\n".join(format_course(record) for record in records[:3])
+            return _new_result(
+                f"🤔 I couldn’t find `{display_course_code(code)}`. Did you mean:\n\n{suggestions}", "course_code",
+            )
+        return None
+
+    def _route_course(self, text, context):
+        """Answer course-code questions and department/level/semester listings from the catalog"""
+        routed = self._route_code(text)
+        if routed is not None or self.catalog is None:
+            return routed
+
+        query_info = extract_course_query(text)
+        if context and context.get("department") and not query_info.get("department") and is_follow_up(text):
+            carried = {k: context.get(k) for k in ("department", "level", "semester")}
+            carried = update_query_context(text.lower(), carried)
+            query_info = {**carried, **{k: v for k, v in query_info.items() if v}}
+        # A department alone is too broad to list; "who is the HOD of law" is not a course query
+        if not (query_info.get("department") and (query_info.get("level") or query_info.get("semester"))):
+            return None
+        response = get_courses_for_query(query_info, self.catalog)
+        if not response:
+            return None
+        result = _new_result(response, "course", query_info)
+        result["score"] = 1.0
+        return result
+
+    def _search_filters(self, text, result, context):
+        """Metadata the search can be narrowed to: named in the query, else carried by a follow-up"""
+        if self.partitions is None:
+            return None
+        pinned = dict(result["query_info"] or {})
+        if context and is_follow_up(text):
+            for key in ("department", "level"):
+                pinned[key] = pinned.get(key) or context.get(key)
+        return normalize_filters(pinned)
+
+    def _apply_search(self, result, found):
+        response, department, score, related = found
+        result.update(
+            response=response,
+            route="semantic",
+            department=result["department"] or _clean_department(department),
+            score=score,
+            related=related,
+        )
+        return score < self.fallback_threshold or not response.strip()
+
+    def _apply_fallback(self, result, reply):
+        if reply:
+            result.update(
+                response=reply + FALLBACK_NOTE,
+                route="fallback",
+                department=result["query_info"].get("department"),
+                related=[],
+            )
+        else:
+            result.update(response=default_response(), route="default", related=[])
+
+    def _finish(self, text, result, cleaned=None, cache_level=None, stages=None):
+        if not result["response"].strip():
+            result.update(response=default_response(), route="default")
+        log_query(
+            text, result["score"],
+            normalized=cleaned,
+            route=result["route"],
+            cache=cache_level,
+            latency_ms={stage: round(ms, 2) for stage, ms in (stages or {}).items()},
+        )
+        record_answer(result["route"], result["score"], sum((stages or {}).values()) / 1000)
+        if cleaned is not None:
+            record_cache_lookup(cache_level or "miss")
+        if result.get("query_info") is not None:
+            result["query_info"] = {
+                "query": text,
+                "response": result["response"],
+                "department": result["department"],
+                "level": result["query_info"].get("level"),
+                "semester": result["query_info"].get("semester"),
+                "score": result["score"],
+            }
+        return result
+
+    def _search(self, items):
+        """find_responses over (query, filters) items; returns (found, cache level) per query"""
+        queries = [query for query, _ in items]
+        if self.model is None and self.lexical is not None:
+            found = lexical_responses(queries, self.dataset, self.lexical, self.match_threshold)
+            return [(hit, None) for hit in found]
+        levels = []
+        found = find_responses(
+            queries, self.dataset, self.embeddings, self.model,
+            threshold=self.match_threshold, index=self.index, cache=self.cache, cache_levels=levels,
+            lexical=self.lexical, fusion=self.fusion, lexical_weight=self.lexical_weight,
+            partitions=self.partitions, filters=[filters for _, filters in items], reranker=self.reranker,
+        )
+        return list(zip(found, levels))
+
+    # --- Public API ---
+    def answer(self, text, context=None):
+        """
+        Answer one message. context is the previous turn's query_info (for follow-ups).
+        Returns a dict with response, route, department, score, related and query_info.
+        """
+        started = time.perf_counter()
+        result, cleaned = self._route(text, context)
+        stages = {"route": (time.perf_counter() - started) * 1000}
+        cache_level = None
+        if cleaned is not None:
+            started = time.perf_counter()
+            item = (cleaned, self._search_filters(text, result, context))
+            found, cache_level = self._batcher(item) if self._batcher else self._search([item])[0]
+            stages["search"] = (time.perf_counter() - started) * 1000
+            if self._apply_search(result, found):
+                started = time.perf_counter()
+                with span("fallback"):
+                    reply = self.fallback.answer_sync(text, cache_key=preprocess_text(text))
+                self._apply_fallback(result, reply)
+                stages["fallback"] = (time.perf_counter() - started) * 1000
+        return self._finish(text, result, cleaned, cache_level, stages)
+
+    def answer_batch(self, texts, contexts=None):
+        """Answer many messages with one encode/search call and concurrent fallbacks"""
+        contexts = contexts or [None] * len(texts)
+        routed, stages = [], []
+        for text, context in zip(texts, contexts):
+            started = time.perf_counter()
+            routed.append(self._route(text, context))
+            stages.append({"route": (time.perf_counter() - started) * 1000})
+        cache_levels = [None] * len(texts)
+
+        pending = [i for i, (_, cleaned) in enumerate(routed) if cleaned is not None]
+        needs_fallback = []
+        if pending:
+            started = time.perf_counter()
+            found = self._search([
+                (routed[i][1], self._search_filters(texts[i], routed[i][0], contexts[i])) for i in pending
+            ])
+            elapsed = (time.perf_counter() - started) * 1000
+            for i, (hit, level) in zip(pending, found):
+                # Batch-wide stages are attributed in full to every query in the batch
+                stages[i]["search"] = elapsed
+                cache_levels[i] = level
+                if self._apply_search(routed[i][0], hit):
+                    needs_fallback.append(i)
+
+        if needs_fallback:
+            started = time.perf_counter()
+            questions = [texts[i] for i in needs_fallback]
+            with span("fallback"):
+                replies = self.fallback.answer_many_sync(questions, [preprocess_text(q) for q in questions])
+            elapsed = (time.perf_counter() - started) * 1000
+            for i, reply in zip(needs_fallback, replies):
+                self._apply_fallback(routed[i][0], reply)
+                stages[i]["fallback"] = elapsed
+
+        return [
+            self._finish(text, result, cleaned, level, stage)
+            for text, (result, cleaned), level, stage in zip(texts, routed, cache_levels, stages)
+        ]
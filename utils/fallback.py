@@ -0,0 +1,161 @@
+import asyncio
+import os
+import threading
+
+from utils.response_cache import ResponseCache
+
+SYSTEM_PROMPT = (
+    "You are a helpful assistant for Crescent University. Answer only based on the "
+    "university's academic programs, departments, and policies."
+)
+FALLBACK_NOTE = "\n\n🧠 _This response was generated by GPT-4 fallback._"
+
+
+class OpenAIBackend:
+    """
+    Chat completion backend using the openai>=1.0 async client.
+    base_url (or OPENAI_BASE_URL) can point it at any OpenAI-compatible server, e.g. a local stub.
+    """
+
+    def __init__(self, model=None, api_key=None, base_url=None, temperature=0.7, max_tokens=300):
+        from openai import AsyncOpenAI
+
+        self.model = model or os.getenv("CRESCENT_FALLBACK_MODEL", "gpt-4")
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        # Retries and timeouts are handled by FallbackClient
+        self.client = AsyncOpenAI(
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            base_url=base_url or os.getenv("OPENAI_BASE_URL"),
+            max_retries=0,
+        )
+
+    async def __call__(self, messages):
+        reply = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        )
+        return reply.choices[0].message.content
+
+
+class StaticBackend:
+    """Offline backend returning a canned answer after an optional delay (tests, benchmarks)"""
+
+    def __init__(self, answer="This is a stub fallback answer.", delay=0.0):
+        self.answer = answer
+        self.delay = delay
+
+    async def __call__(self, messages):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.answer
+
+
+class FallbackClient:
+    """
+    GPT fallback with a hard latency budget, bounded concurrency, retry with
+    exponential backoff and a cache of answers keyed by normalized question.
+    Coroutines run on a private event loop thread, so answer_sync can be called
+    from Streamlit's script threads without blocking other sessions.
+    """
+
+    def __init__(self, backend=None, timeout=8.0, max_concurrency=4, retries=2, backoff=0.5, cache=None):
+        self._backend = backend
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache if cache is not None else ResponseCache(max_size=1024, ttl=24 * 3600)
+        self._loop = None
+        self._loop_pid = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = OpenAIBackend()
+        return self._backend
+
+    async def answer(self, question, cache_key=None):
+        """Return the fallback answer for question, or None on error/timeout"""
+        key = cache_key or question
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": question},
+        ]
+
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            print("GPT fallback skipped: too many requests in flight")
+            return None
+
+        try:
+            for attempt in range(self.retries + 1):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    reply = await asyncio.wait_for(self.backend(messages), remaining)
+                except asyncio.TimeoutError:
+                    print(f"GPT fallback timed out after {self.timeout:.1f}s")
+                    break
+                except Exception as e:
+                    print(f"GPT fallback error (attempt {attempt + 1}): {e}")
+                    delay = min(self.backoff * 2 ** attempt, deadline - loop.time())
+                    if delay > 0 and attempt < self.retries:
+                        await asyncio.sleep(delay)
+                    continue
+                if reply and reply.strip():
+                    self.cache.put(key, reply)
+                    return reply
+                break
+        finally:
+            self._semaphore.release()
+        return None
+
+    def _ensure_loop(self):
+        with self._lock:
+            # Threads don't survive fork(): a forked worker process starts its own loop
+            if self._loop is None or self._loop_pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._loop_pid = os.getpid()
+                self._semaphore = None
+                threading.Thread(target=self._loop.run_forever, name="gpt-fallback", daemon=True).start()
+        return self._loop
+
+    def answer_sync(self, question, cache_key=None):
+        """Blocking wrapper around answer() for synchronous callers"""
+        future = asyncio.run_coroutine_threadsafe(self.answer(question, cache_key), self._ensure_loop())
+        try:
+            # The coroutine enforces the budget; the extra second only guards against a stuck loop
+            return future.result(self.timeout + 1)
+        except TimeoutError:
+            future.cancel()
+            return None
+
+    def answer_many_sync(self, questions, cache_keys=None):
+        """Answer several questions concurrently; one reply (or None) per question"""
+        cache_keys = cache_keys or [None] * len(questions)
+
+        async def gather():
+            return await asyncio.gather(*[self.answer(q, key) for q, key in zip(questions, cache_keys)])
+
+        future = asyncio.run_coroutine_threadsafe(gather(), self._ensure_loop())
+        try:
+            return future.result(self.timeout + 1)
+        except TimeoutError:
+            future.cancel()
+            return [None] * len(questions)
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+
+from utils.engine import AnswerEngine
+
+DATA_PATH = "data/crescent_qa.json"
+COURSE_DATA_PATH = "data/course_data.json"
+
+# Seconds between data file checks; 0 disables hot reload
+RELOAD_INTERVAL = float(os.getenv("CRESCENT_RELOAD_INTERVAL", 0))
+
+# Retired snapshots keep their batcher running this long so in-flight requests can finish
+RETIRE_GRACE_SECONDS = 30.0
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+def _row_diff(old, new):
+    """Count added, removed and changed questions between two datasets"""
+    old_rows = dict(zip(old["question"], old["answer"]))
+    new_rows = dict(zip(new["question"], new["answer"]))
+    added = sum(1 for q in new_rows if q not in old_rows)
+    removed = sum(1 for q in old_rows if q not in new_rows)
+    changed = sum(1 for q, a in new_rows.items() if q in old_rows and old_rows[q] != a)
+    return added, removed, changed
+
+
+class ReloadingEngine:
+    """
+    AnswerEngine wrapper that reloads when the data files change.
+    A watcher thread polls the files' mtime and size; once a change has settled it
+    loads a new engine (the embedding cache re-encodes only new or changed
+    questions) and swaps it in with one attribute assignment. Each call reads the
+    current snapshot once, so in-flight requests finish on the engine they started with.
+    """
+
+    def __init__(self, data_path=DATA_PATH, course_data_path=COURSE_DATA_PATH, interval=RELOAD_INTERVAL, **load_kwargs):
+        self.paths = [p for p in (data_path, course_data_path) if p]
+        self.interval = interval or 2.0
+        self._load_kwargs = dict(load_kwargs, data_path=data_path, course_data_path=course_data_path)
+        self._signatures = self._read_signatures()
+        self.engine = AnswerEngine.load(**self._load_kwargs)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watcher_pid = None
+
+    def _read_signatures(self):
+        return [_file_signature(p) for p in self.paths]
+
+    def _ensure_watcher(self):
+        # Threads don't survive fork(): a forked worker process starts its own watcher
+        if self._watcher_pid == os.getpid() or self._stopped.is_set():
+            return
+        with self._lock:
+            if self._watcher_pid != os.getpid():
+                self._watcher_pid = os.getpid()
+                threading.Thread(target=self._watch, name="data-reloader", daemon=True).start()
+
+    def _watch(self):
+        pending = None
+        while not self._stopped.wait(self.interval):
+            signatures = self._read_signatures()
+            if signatures == self._signatures:
+                pending = None
+                continue
+            # Wait one more interval for the files to stop changing (editor saves, copies)
+            if signatures != pending:
+                pending = signatures
+                continue
+            self.reload(signatures)
+            pending = None
+
+    def reload(self, signatures=None):
+        """Load a fresh engine from the data files and swap it in; keeps the old one on error"""
+        signatures = signatures or self._read_signatures()
+        old = self.engine
+        started = time.perf_counter()
+        try:
+            new = AnswerEngine.load(**{**self._load_kwargs, "fallback": old.fallback})
+        except Exception as e:
+            print(f"Data reload failed, keeping the current data: {e}")
+            self._signatures = signatures
+            return False
+
+        added, removed, changed = _row_diff(old.dataset, new.dataset)
+        self.engine = new
+        self._signatures = signatures
+        print(
+            f"Reloaded data in {time.perf_counter() - started:.1f}s: "
+            f"{added} added, {removed} removed, {changed} changed answers"
+        )
+        if old._batcher is not None:
+            timer = threading.Timer(RETIRE_GRACE_SECONDS, old._batcher.close)
+            timer.daemon = True
+            timer.start()
+        return True
+
+    def stop(self):
+        self._stopped.set()
+
+    def answer(self, text, context=None):
+        self._ensure_watcher()
+        return self.engine.answer(text, context)
+
+    def answer_batch(self, texts, contexts=None):
+        self._ensure_watcher()
+        return self.engine.answer_batch(texts, contexts)
+
+
+def open_engine(**load_kwargs):
+    """AnswerEngine.load(), wrapped in a ReloadingEngine when CRESCENT_RELOAD_INTERVAL is set"""
+    if RELOAD_INTERVAL > 0:
+        return ReloadingEngine(**load_kwargs)
+    return AnswerEngine.load(**load_kwargs)
@@ -0,0 +1,70 @@
+import re
+from functools import lru_cache
+from types import MappingProxyType
+
+from utils.conversations import GREETING_KEYWORDS, SOCIAL_PATTERNS
+
+# Words that open a follow-up to the previous question ("and 300 level?", "what about law?")
+FOLLOW_UP_TRIGGERS = ["what about", "how about", "and", "also", "okay", "ok", "now", "then", "continue", "next"]
+
+_GREETING = "|".join(re.escape(kw) for kw in sorted(GREETING_KEYWORDS, key=len, reverse=True))
+_FOLLOW_UP = "|".join(re.escape(kw) for kw in sorted(FOLLOW_UP_TRIGGERS, key=len, reverse=True))
+
+# One alternation for every intent and slot, compiled once. Each branch is a named
+# group; finditer() walks the message once and match.lastgroup says which branch hit.
+#   greeting  - the whole message is a greeting ("hi", "good morning bot!")
+#   greet     - a greeting opening a longer message ("hi, what are the fees?")
+#   follow_up - a follow-up trigger opening the message
+#   social_N  - SOCIAL_PATTERNS, in order
+#   level / semester - slots
+_BRANCHES = [
+    ("greeting", rf"^\W*(?:{_GREETING})(?:\s+(?:there|bot|crescentbot|everyone|all))?[\W_]*$"),
+    ("greet", rf"^\W*(?:{_GREETING})\b[\s,!.]*"),
+    ("follow_up", rf"^\W*(?:{_FOLLOW_UP})\b"),
+    *((f"social_{i}", pattern) for i, pattern in enumerate(SOCIAL_PATTERNS)),
+    # "300 level", "300l", "300lvl" or a bare "300" that isn't part of an amount ("100,000")
+    ("level", r"\b[1-5]00(?:\s*l(?:evel|vl)?\b|\b(?![,.]\d))"),
+    # "second semester", "2nd sem", or a bare ordinal ending the message ("and second?")
+    ("semester", r"\b(?:first|second|1st|2nd)\b(?=\s+sem(?:ester)?\b|\W*$)"),
+]
+INTENT_RE = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in _BRANCHES))
+_SOCIAL_KEYS = list(SOCIAL_PATTERNS)
+_SEMESTERS = {"first": "First", "1st": "First", "second": "Second", "2nd": "Second"}
+
+
+@lru_cache(maxsize=4096)
+def route_intent(text):
+    """
+    Classify a message in one regex pass.
+    Returns (intent, slots): intent is "greeting", "social", "follow_up" or "query";
+    slots may hold "social" (the SOCIAL_PATTERNS key), "level", "semester" and
+    "text" (the message without an opening greeting). Slots are read-only.
+    """
+    lowered = str(text).lower()
+    intent = None
+    slots = {"text": str(text)}
+    follow_up = False
+    for match in INTENT_RE.finditer(lowered):
+        branch = match.lastgroup
+        if branch == "greeting":
+            intent = intent or "greeting"
+        elif branch == "greet":
+            # lower() keeps offsets for everything but a few non-ASCII letters
+            slots["text"] = (str(text) if len(lowered) == len(str(text)) else lowered)[match.end():]
+        elif branch == "follow_up":
+            follow_up = True
+        elif branch.startswith("social_"):
+            if intent is None:
+                intent = "social"
+                slots["social"] = _SOCIAL_KEYS[int(branch[len("social_"):])]
+        elif branch == "level":
+            slots.setdefault("level", match.group()[:3])
+        elif branch == "semester":
+            slots.setdefault("semester", _SEMESTERS[match.group()])
+    if intent is None:
+        intent = "follow_up" if follow_up else "query"
+    return intent, MappingProxyType(slots)
+
+def is_follow_up(text):
+    """True when the message opens with a follow-up trigger ("and", "what about", ...)"""
+    return route_intent(text)[0] == "follow_up"
@@ -0,0 +1,97 @@
+import math
+import re
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# "CSC 101", "csc-101" and "csc101" all index as the single token "csc101"
+CODE_RE = re.compile(r"\b([a-z]{2,4})[\s-]?(\d{3})\b")
+
+
+def tokenize(text):
+    """Lowercase word tokens, plus one joined token per course code"""
+    text = str(text).lower()
+    tokens = TOKEN_RE.findall(text)
+    tokens += [prefix + number for prefix, number in CODE_RE.findall(text)]
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over dataset rows (question counted twice, plus answer).
+    Per-posting BM25 weights are precomputed at build time, so a query is one
+    scatter-add per query term. Scores are also reported normalized to [0, 1]
+    against the best weight each query term reaches in any row, so they can be fused
+    with cosine similarities.
+    """
+
+    def __init__(self, questions, answers=None, k1=1.5, b=0.75):
+        answers = answers if answers is not None else [""] * len(questions)
+        docs = [tokenize(q) * 2 + tokenize(a) for q, a in zip(questions, answers)]
+        self.n_docs = len(docs)
+        self.k1 = k1
+        lengths = np.array([len(d) for d in docs], dtype=np.float32)
+        avg_length = float(lengths.mean()) if len(docs) else 1.0
+
+        term_freqs = {}
+        for doc_id, doc in enumerate(docs):
+            counts = {}
+            for token in doc:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                term_freqs.setdefault(token, []).append((doc_id, tf))
+
+        self.postings = {}
+        self.idf = {}
+        self.max_weight = {}
+        for token, entries in term_freqs.items():
+            ids = np.array([doc_id for doc_id, _ in entries], dtype=np.int64)
+            tf = np.array([tf for _, tf in entries], dtype=np.float32)
+            idf = self._idf(len(entries))
+            norm = k1 * (1 - b + b * lengths[ids] / avg_length)
+            self.postings[token] = (ids, (idf * tf * (k1 + 1) / (tf + norm)).astype(np.float32))
+            self.idf[token] = idf
+            self.max_weight[token] = float(self.postings[token][1].max())
+        self.unseen_weight = float(np.median(list(self.max_weight.values()))) if self.max_weight else 1.0
+
+    def _idf(self, df):
+        return math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def __len__(self):
+        return self.n_docs
+
+    def _max_score(self, terms):
+        # Best weight each term reaches in any row; unseen terms count as a typical
+        # term, so a query that is mostly unknown words can't score high
+        return sum(self.max_weight.get(t, self.unseen_weight) for t in terms)
+
+    def scores(self, query):
+        """BM25 score of every row for one query, normalized to [0, 1]"""
+        terms = set(tokenize(query))
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                ids, weights = posting
+                scores[ids] += weights
+        upper = self._max_score(terms)
+        return scores / upper if upper else scores
+
+    def search(self, queries, k):
+        """
+        Return the k best rows for each query text.
+        Returns: normalized scores (n_queries, k) and row ids (n_queries, k), best first
+        """
+        k = min(k, self.n_docs)
+        all_scores = np.zeros((len(queries), k), dtype=np.float32)
+        all_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        if k == 0:
+            return all_scores, all_ids
+        for i, query in enumerate(queries):
+            scores = self.scores(query)
+            top = np.argpartition(-scores, k - 1)[:k] if k < self.n_docs else np.arange(self.n_docs)
+            top = top[np.argsort(-scores[top])]
+            hits = scores[top] > 0
+            all_scores[i, :hits.sum()] = scores[top][hits]
+            all_ids[i, :hits.sum()] = top[hits]
+        return all_scores, all_ids
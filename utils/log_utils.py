@@ -1,10 +1,132 @@
+import atexit
 import datetime
+import json
 import os
+import queue
+import threading
 
-def log_query(query, score, log_file="query_log.txt"):
-    """Logs the query and similarity score with timestamp"""
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_line = f"{timestamp} | Query: {query} | Score: {score:.4f}\n"
+LOG_FILE = os.getenv("CRESCENT_QUERY_LOG", "logs/query_log.jsonl")
+MAX_LOG_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
 
-    with open(log_file, "a", encoding="utf-8") as f:
-        f.write(log_line)
+# Records waiting for the writer; when full, new records are dropped rather than blocking a request
+QUEUE_SIZE = 10_000
+FLUSH_INTERVAL = 1.0
+MAX_BATCH = 512
+
+
+class QueryLogger:
+    """
+    Structured JSONL query log written by a background thread.
+    log() only enqueues, so it never blocks the request path: records are
+    written in batches through one open file handle, the file is rotated by
+    size (query_log.jsonl -> .1 -> .2 ...), and records are dropped (and
+    counted) if the writer falls QUEUE_SIZE behind.
+    """
+
+    def __init__(self, path=LOG_FILE, max_bytes=MAX_LOG_BYTES, backups=LOG_BACKUPS,
+                 queue_size=QUEUE_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._worker = None
+        atexit.register(self.close)
+
+    def _ensure_worker(self):
+        # Threads don't survive fork(): a forked worker process starts its own writer
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(self.queue_size)
+                self._worker = threading.Thread(target=self._run, args=(self._queue,), name="query-log", daemon=True)
+                self._worker.start()
+                self._pid = os.getpid()
+
+    def log(self, record):
+        """Queue one record (a JSON-serializable dict); a timestamp is added"""
+        self._ensure_worker()
+        record = {"ts": datetime.datetime.now().isoformat(timespec="milliseconds"), **record}
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=2.0):
+        """Flush queued records and stop the writer"""
+        if self._pid != os.getpid():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._worker.join(timeout)
+        self._pid = None
+
+    def _rotate(self, f):
+        f.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        return open(self.path, "ab")
+
+    def _run(self, work_queue):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        f = open(self.path, "ab")
+        try:
+            while True:
+                try:
+                    batch = [work_queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                while len(batch) < MAX_BATCH:
+                    try:
+                        batch.append(work_queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = None in batch
+                try:
+                    for record in batch:
+                        if record is None:
+                            continue
+                        line = (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+                        if f.tell() > 0 and f.tell() + len(line) > self.max_bytes:
+                            f = self._rotate(f)
+                        f.write(line)
+                    f.flush()
+                except OSError as e:
+                    print(f"Query log write failed: {e}")
+                if stop:
+                    return
+        finally:
+            f.close()
+
+
+_default_logger = None
+_default_lock = threading.Lock()
+
+def get_query_logger():
+    """The process-wide QueryLogger writing to LOG_FILE"""
+    global _default_logger
+    if _default_logger is None:
+        with _default_lock:
+            if _default_logger is None:
+                _default_logger = QueryLogger()
+    return _default_logger
+
+def log_query(query, score, **fields):
+    """
+    Log a query and its similarity score, plus any structured fields
+    (normalized query, route, cache hit, per-stage latency...), without blocking.
+    """
+    get_query_logger().log({"query": query, "score": round(float(score), 4), **fields})
@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Metrics are on unless CRESCENT_METRICS=0; when off, span() and the recorders are no-ops
+ENABLED = os.getenv("CRESCENT_METRICS", "1").lower() not in ("0", "false", "no")
+
+# Seconds; spans range from sub-millisecond lookups to multi-second GPT fallbacks
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SCORE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.65, 0.7, 0.8, 0.9, 0.95, 1.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style) with interpolated quantiles"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        slot = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                slot = i
+                break
+        with self._lock:
+            self.counts[slot] += 1
+            self.total += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate the q-quantile by linear interpolation inside its bucket"""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            if seen + n >= rank and n:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class Metrics:
+    """Process-wide counters and histograms keyed by (name, labels)"""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.help = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels=(), amount=1, help=""):
+        key = (name, tuple(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+            if help:
+                self.help.setdefault(name, help)
+
+    def observe(self, name, value, labels=(), buckets=LATENCY_BUCKETS, help=""):
+        key = (name, tuple(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, Histogram(buckets))
+                if help:
+                    self.help.setdefault(name, help)
+        histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def counter_value(self, name, **labels):
+        """Sum of a counter over all label sets matching the given labels"""
+        with self._lock:
+            items = list(self.counters.items())
+        return sum(v for (n, l), v in items if n == name and set(labels.items()) <= set(l))
+
+    def summary(self):
+        """p50/p95/p99 per stage, fallback rate and cache hit rate"""
+        answers = self.counter_value("crescent_answers_total")
+        searched = self.counter_value("crescent_cache_lookups_total")
+        stages = {
+            dict(labels)["stage"]: {
+                "count": h.count,
+                "p50_ms": round(h.quantile(0.5) * 1000, 3),
+                "p95_ms": round(h.quantile(0.95) * 1000, 3),
+                "p99_ms": round(h.quantile(0.99) * 1000, 3),
+            }
+            for (name, labels), h in list(self.histograms.items())
+            if name == "crescent_stage_seconds"
+        }
+        return {
+            "answers": answers,
+            "fallback_rate": self.counter_value("crescent_answers_total", route="fallback") / answers if answers else 0.0,
+            "cache_hit_rate": (
+                (searched - self.counter_value("crescent_cache_lookups_total", level="miss")) / searched
+                if searched else 0.0
+            ),
+            "stages": stages,
+        }
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{label_text(labels)} {value}")
+
+        for (name, labels), histogram in histograms:
+            if name not in seen:
+                seen.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+            with histogram._lock:
+                counts, total, count = list(histogram.counts), histogram.total, histogram.count
+            cumulative = 0
+            for bound, n in zip(histogram.buckets + ("+Inf",), counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{label_text(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{label_text(labels)} {total}")
+            lines.append(f"{name}_count{label_text(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+@contextmanager
+def _timed(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe(
+            "crescent_stage_seconds", time.perf_counter() - started, (("stage", stage),),
+            help="Time spent in each answering pipeline stage",
+        )
+
+def span(stage):
+    """Context manager timing one pipeline stage into crescent_stage_seconds{stage=...}"""
+    return _timed(stage) if ENABLED else _NULL_SPAN
+
+def record_answer(route, score, seconds):
+    """Count an answered message by route and record its score and total latency"""
+    if not ENABLED:
+        return
+    metrics.inc("crescent_answers_total", (("route", route),), help="Answered messages by route")
+    metrics.observe("crescent_answer_seconds", seconds, help="End-to-end answer latency")
+    if route in ("exact", "semantic", "fallback", "default"):
+        metrics.observe("crescent_answer_score", score, buckets=SCORE_BUCKETS, help="Best retrieval score of answered queries")
+
+def record_cache_lookup(level):
+    """Count a response-cache lookup by the level that answered it ("exact", "semantic" or "miss")"""
+    if ENABLED:
+        metrics.inc("crescent_cache_lookups_total", (("level", level),), help="Response cache lookups by answering level")
+
+def record_rerank(outcome):
+    """Count a second-stage rerank decision ("changed", "kept", "skipped_margin" or "skipped_budget")"""
+    if ENABLED:
+        metrics.inc("crescent_rerank_total", (("outcome", outcome),), help="Second-stage rerank decisions")
+
+def start_log_dump(interval, log=None):
+    """Write metrics.summary() to the query log (or `log`) every `interval` seconds"""
+    if not ENABLED or interval <= 0:
+        return None
+    if log is None:
+        from utils.log_utils import get_query_logger
+        log = get_query_logger().log
+
+    def run():
+        while True:
+            time.sleep(interval)
+            log({"event": "metrics", **metrics.summary()})
+
+    thread = threading.Thread(target=run, name="metrics-dump", daemon=True)
+    thread.start()
+    return thread
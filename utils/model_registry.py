@@ -0,0 +1,118 @@
+import os
+import threading
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Query encoder backends:
+#   torch - the float32 reference model
+#   onnx  - ONNX Runtime (needs sentence-transformers>=3.2 with the onnx extra)
+#   int8  - the torch model with Linear layers dynamically quantized to int8
+ENCODER_BACKENDS = ("torch", "onnx", "int8")
+
+# A backend must reproduce the reference embeddings at least this closely (cosine)
+PARITY_MIN_COSINE = float(os.getenv("CRESCENT_ENCODER_MIN_COSINE", 0.99))
+PARITY_SAMPLE_SIZE = 64
+
+# Process-wide model instances, keyed by (model name, backend)
+_models = {}
+_lock = threading.Lock()
+
+def encoder_backend():
+    """Configured query encoder backend (CRESCENT_ENCODER_BACKEND, default torch)"""
+    backend = os.getenv("CRESCENT_ENCODER_BACKEND", "torch").lower()
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {backend}")
+    return backend
+
+def fallback_enabled():
+    """Whether a failing backend falls back to torch (CRESCENT_ENCODER_FALLBACK, default on) instead of raising"""
+    return os.getenv("CRESCENT_ENCODER_FALLBACK", "1").lower() not in ("0", "false", "no")
+
+def warmup_model(model):
+    """Run one throwaway encode so the first real query doesn't pay for lazy init"""
+    model.encode(["What courses are offered in 100 level?"], show_progress_bar=False)
+    return model
+
+def _load(model_name, backend):
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx")
+    if backend == "int8":
+        model = SentenceTransformer(model_name, device="cpu")
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    raise ValueError(f"Unknown encoder backend: {backend}")
+
+def get_model(model_name=MODEL_NAME, warmup=True, backend=None):
+    """
+    Return the shared encoder for model_name and backend, loading it on first use.
+    Loading is guarded by a lock so concurrent sessions never build the model twice.
+    If a non-torch backend can't be loaded, the torch model is used instead
+    (unless CRESCENT_ENCODER_FALLBACK=0).
+    """
+    backend = backend or encoder_backend()
+    key = (model_name, backend)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            try:
+                model = _load(model_name, backend)
+            except Exception as e:
+                if backend == "torch" or not fallback_enabled():
+                    raise
+                print(f"Could not load the {backend} encoder for {model_name}, using torch: {e}")
+                model = _models.get((model_name, "torch")) or SentenceTransformer(model_name)
+                _models[(model_name, "torch")] = model
+            if warmup:
+                warmup_model(model)
+            _models[key] = model
+    return model
+
+def release_model(model_name=MODEL_NAME, backend="torch"):
+    """Drop a shared model so its memory can be reclaimed once no one else holds it"""
+    with _lock:
+        _models.pop((model_name, backend), None)
+
+def is_loaded(model_name=MODEL_NAME, backend=None):
+    """True once the model has been loaded in this process"""
+    return (model_name, backend or encoder_backend()) in _models
+
+def check_parity(model, sentences, reference):
+    """
+    Compare a model's embeddings of sentences with reference (float32) embeddings of the same sentences.
+    Returns the worst per-sentence cosine similarity.
+    """
+    if not len(sentences):
+        return 1.0
+    encoded = np.asarray(model.encode(list(sentences), convert_to_numpy=True), dtype=np.float32)
+    reference = np.asarray(reference, dtype=np.float32)
+    encoded /= np.linalg.norm(encoded, axis=1, keepdims=True).clip(min=1e-12)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True).clip(min=1e-12)
+    return float(np.min(np.sum(encoded * reference, axis=1)))
+
+def verify_encoder(model, sentences, reference, model_name=MODEL_NAME, backend=None):
+    """
+    Parity-check a non-torch encoder against reference embeddings of a sample of sentences.
+    Returns the model if it passes, else the torch model (or raises if fallback is disabled).
+    """
+    backend = backend or encoder_backend()
+    if backend == "torch" or not len(sentences):
+        return model
+
+    picks = np.linspace(0, len(sentences) - 1, min(PARITY_SAMPLE_SIZE, len(sentences))).astype(int)
+    worst = check_parity(model, [sentences[i] for i in picks], np.asarray(reference)[picks])
+    if worst >= PARITY_MIN_COSINE:
+        return model
+
+    message = f"{backend} encoder failed the parity check (min cosine {worst:.4f} < {PARITY_MIN_COSINE})"
+    if not fallback_enabled():
+        raise RuntimeError(message)
+    print(f"{message}, using torch")
+    return get_model(model_name, backend="torch")
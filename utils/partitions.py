@@ -0,0 +1,113 @@
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from utils.course_query import _entry_departments
+from utils.vector_index import FlatIndex
+
+FILTER_FIELDS = ("department", "faculty", "level")
+
+# A slice this close to the whole corpus is searched through the main index instead
+MAX_SLICE_FRACTION = 0.8
+
+
+def _row_values(field, value):
+    """Canonical values of one metadata cell; an empty set means the row applies to everyone"""
+    if value is None or str(value).strip().lower() in ("", "none", "nan"):
+        return set()
+    if field == "department":
+        return _entry_departments(str(value))
+    if field == "level":
+        return set(re.findall(r"\d{3}", str(value)))
+    return {str(value).strip().upper()}
+
+def normalize_filters(filters):
+    """Keep the supported, non-empty filters in canonical form, or None if nothing pins the search"""
+    if not filters:
+        return None
+    canonical = {}
+    for field in FILTER_FIELDS:
+        values = _row_values(field, filters.get(field))
+        if len(values) == 1:
+            canonical[field] = values.pop()
+    # A department already implies its faculty
+    if "department" in canonical:
+        canonical.pop("faculty", None)
+    return canonical or None
+
+def filter_scope(filters):
+    """Short stable text for a set of filters (cache scoping, logs)"""
+    return " ".join(f"{field}={filters[field]}" for field in FILTER_FIELDS if filters and field in filters) or None
+
+
+class MetadataPartitions:
+    """
+    Per-department/faculty/level row bitmaps over the dataset, with small exact
+    sub-indexes for the slices queries actually ask for.
+    A row matches a filter when its column carries that value or is empty
+    (general rows, e.g. fees or hostel questions, belong to every slice).
+    Sub-indexes are built on first use and kept in an LRU of `max_slices`.
+    """
+
+    def __init__(self, dataset, embeddings, max_slices=64):
+        self.embeddings = embeddings
+        self.n_rows = len(dataset)
+        self.max_slices = max_slices
+        self.masks = {}
+        for field in FILTER_FIELDS:
+            if field not in dataset.columns:
+                continue
+            cells = [_row_values(field, value) for value in dataset[field].tolist()]
+            general = np.array([not values for values in cells], dtype=bool)
+            for value in set().union(*cells):
+                specific = np.array([value in values for values in cells], dtype=bool)
+                self.masks[(field, value)] = specific | general
+        self._slices = OrderedDict()  # scope -> (row ids, FlatIndex, row mask)
+        self._lock = threading.Lock()
+
+    def mask(self, filters):
+        """Boolean row mask for canonical filters, or None when they don't narrow the corpus"""
+        mask = None
+        for field, value in (filters or {}).items():
+            field_mask = self.masks.get((field, value))
+            if field_mask is None:
+                # Unknown value (no row carries it): don't filter on it
+                continue
+            mask = field_mask if mask is None else mask & field_mask
+        if mask is None or mask.sum() > MAX_SLICE_FRACTION * self.n_rows:
+            return None
+        return mask
+
+    def slice_for(self, filters):
+        """(row ids, sub-index, row mask) for canonical filters, or None to search the whole corpus"""
+        scope = filter_scope(filters)
+        if scope is None:
+            return None
+        with self._lock:
+            if scope in self._slices:
+                self._slices.move_to_end(scope)
+                return self._slices[scope]
+        mask = self.mask(filters)
+        if mask is None or not mask.any():
+            return None
+        rows = np.flatnonzero(mask)
+        entry = (rows, FlatIndex(self.embeddings[rows]), mask)
+        with self._lock:
+            self._slices[scope] = entry
+            while len(self._slices) > self.max_slices:
+                self._slices.popitem(last=False)
+        return entry
+
+    def search(self, queries, filters, k):
+        """
+        Search only the rows matching `filters`.
+        Returns: scores and corpus row ids like an index's search, plus the slice's row
+        mask, or None when the filters don't narrow the corpus
+        """
+        found = self.slice_for(filters)
+        if found is None:
+            return None
+        rows, index, mask = found
+        scores, ids = index.search(queries, k)
+        return scores, np.where(ids >= 0, rows[np.clip(ids, 0, None)], -1), mask
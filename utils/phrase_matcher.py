@@ -0,0 +1,88 @@
+import re
+
+# Word tokens; apostrophes and hyphens stay inside a token ("what's", "a-level")
+WORD_RE = re.compile(r"[\w'’-]+")
+
+# Trie key marking the end of a phrase (tokens are never None)
+_END = None
+
+
+class PhraseMatcher:
+    """
+    Token trie over single- and multi-word phrases ("sem", "mass comm", "school fees").
+    Rewrites run in one left-to-right pass with longest-match semantics, so
+    "school fees" wins over "school" and replacements are never re-matched.
+    """
+
+    def __init__(self, mapping):
+        self.root = {}
+        for phrase, replacement in mapping.items():
+            tokens = phrase.lower().split()
+            if not tokens:
+                continue
+            node = self.root
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[_END] = replacement
+
+    def match_at(self, tokens, start):
+        """Return (end, replacement) for the longest phrase starting at tokens[start], else None"""
+        node = self.root
+        best = None
+        for i in range(start, len(tokens)):
+            node = node.get(tokens[i].lower())
+            if node is None:
+                break
+            if _END in node:
+                best = (i + 1, node[_END])
+        return best
+
+    def replace_tokens(self, tokens):
+        """Rewrite a token list; each matched phrase becomes one replacement item"""
+        out = []
+        i = 0
+        while i < len(tokens):
+            match = self.match_at(tokens, i)
+            if match:
+                i, replacement = match
+                out.append(replacement)
+            else:
+                out.append(tokens[i])
+                i += 1
+        return out
+
+    def find(self, text):
+        """Return (phrase, replacement) pairs for every non-overlapping match in text"""
+        spans = list(WORD_RE.finditer(text))
+        tokens = [m.group(0) for m in spans]
+        found = []
+        i = 0
+        while i < len(tokens):
+            match = self.match_at(tokens, i)
+            if match:
+                end, replacement = match
+                found.append((" ".join(tokens[i:end]).lower(), replacement))
+                i = end
+            else:
+                i += 1
+        return found
+
+    def replace(self, text):
+        """Rewrite free text, keeping punctuation and spacing around unmatched words"""
+        spans = list(WORD_RE.finditer(text))
+        tokens = [m.group(0) for m in spans]
+        pieces = []
+        last = 0
+        i = 0
+        while i < len(tokens):
+            match = self.match_at(tokens, i)
+            if match:
+                end, replacement = match
+                pieces.append(text[last:spans[i].start()])
+                pieces.append(replacement)
+                last = spans[end - 1].end()
+                i = end
+            else:
+                i += 1
+        pieces.append(text[last:])
+        return "".join(pieces)
@@ -1,8 +1,11 @@
 import re
+from functools import lru_cache
 from symspellpy import SymSpell, Verbosity
 import pkg_resources
 import streamlit as st
 
+from utils.phrase_matcher import PhraseMatcher
+
 ABBREVIATIONS = {
     "u": "you", "r": "are", "ur": "your", "cn": "can", "cud": "could",
     "shud": "should", "wud": "would", "abt": "about", "bcz": "because",
@@ -32,6 +35,18 @@ SYNONYMS = {
     "requirement": "criteria", "conditions": "criteria", "needed": "required"
 }
 
+# Compiled once at import; each map is applied in a single longest-match pass
+ABBREVIATION_MATCHER = PhraseMatcher(ABBREVIATIONS)
+SYNONYM_MATCHER = PhraseMatcher(SYNONYMS)
+
+# Bounded memo sizes for spelling corrections and whole utterances
+WORD_CACHE_SIZE = 50_000
+UTTERANCE_CACHE_SIZE = 10_000
+
+# Tokens that should never be spell-corrected: numbers ("200") and course codes ("csc101")
+NUMERIC_RE = re.compile(r"\d+(?:[.,]\d+)*")
+COURSE_CODE_RE = re.compile(r"[a-z]{2,4}(?:-[a-z]{2,4})?\d{3}")
+
 @st.cache_resource
 def get_sym_spell():
     sym_spell = SymSpell(max_dictionary_edit_distance=2, prefix_length=7)
@@ -45,29 +60,44 @@ def normalize_text(text):
     return text.lower()
 
 def apply_abbreviations(words):
-    return [ABBREVIATIONS.get(w.lower(), w) for w in words]
+    return ABBREVIATION_MATCHER.replace_tokens(words)
 
 def apply_synonyms(words):
-    return [SYNONYMS.get(w.lower(), w) for w in words]
+    return SYNONYM_MATCHER.replace_tokens(words)
 
-def preprocess_text(text, debug=False):
+@lru_cache(maxsize=WORD_CACHE_SIZE)
+def correct_word(word):
+    """Spell-correct one token, skipping lookup for numbers, course codes and known words"""
+    if NUMERIC_RE.fullmatch(word) or COURSE_CODE_RE.fullmatch(word):
+        return word
+    sym_spell = get_sym_spell()
+    if word in sym_spell.words:
+        return word
+    suggestions = sym_spell.lookup(word, Verbosity.CLOSEST, max_edit_distance=2)
+    return suggestions[0].term if suggestions else word
+
+def _run_pipeline(text):
     text = normalize_text(text)
     words = text.split()
 
-    expanded = apply_abbreviations(words)
+    # Multi-word expansions ("wats" -> "what is") are corrected token by token
+    expanded = [token for phrase in apply_abbreviations(words) for token in phrase.split()]
+    corrected = [correct_word(word) for word in expanded]
+    final_words = apply_synonyms(corrected)
+    return text, expanded, corrected, final_words
 
-    sym_spell = get_sym_spell()
-    corrected = []
-    for word in expanded:
-        suggestions = sym_spell.lookup(word, Verbosity.CLOSEST, max_edit_distance=2)
-        corrected.append(suggestions[0].term if suggestions else word)
+@lru_cache(maxsize=UTTERANCE_CACHE_SIZE)
+def _preprocess_cached(text):
+    return ' '.join(_run_pipeline(text)[3])
 
-    final_words = apply_synonyms(corrected)
+def preprocess_text(text, debug=False):
+    if not debug:
+        return _preprocess_cached(text)
 
-    if debug:
-        print("Original:", text)
-        print("Expanded:", expanded)
-        print("Corrected:", corrected)
-        print("With Synonyms:", final_words)
+    text, expanded, corrected, final_words = _run_pipeline(text)
+    print("Original:", text)
+    print("Expanded:", expanded)
+    print("Corrected:", corrected)
+    print("With Synonyms:", final_words)
 
     return ' '.join(final_words)
@@ -0,0 +1,59 @@
+import random
+import string
+
+from utils.phrase_matcher import PhraseMatcher
+from utils.preprocess import ABBREVIATIONS
+from utils.course_query import NORMALIZATION_MAP
+
+# Reverse the normalization maps: "semester" -> ["sem"], "computer science" -> ["csc", "comp sci"]
+_SLANG = {}
+for _short, _full in list(ABBREVIATIONS.items()) + list(NORMALIZATION_MAP.items()):
+    _SLANG.setdefault(_full, []).append(_short)
+SLANG_MATCHER = PhraseMatcher({full: sorted(set(shorts)) for full, shorts in _SLANG.items()})
+
+
+def _typo(word, rng):
+    """One keyboard-style edit: drop, double, swap or substitute a letter"""
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(("drop", "double", "swap", "substitute"))
+    if kind == "drop":
+        return word[:i] + word[i + 1:]
+    if kind == "double":
+        return word[:i] + word[i] + word[i:]
+    if kind == "swap":
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+
+def perturb_query(text, rng, typo_rate=0.15, slang_rate=0.5):
+    """
+    Rewrite a question the way users type it: informal abbreviations and
+    department slang, a few typos in longer words, no capitals or final "?".
+    Numbers and course codes are left intact.
+    """
+    tokens = text.lower().rstrip("?.! ").split()
+    out = []
+    i = 0
+    while i < len(tokens):
+        match = SLANG_MATCHER.match_at(tokens, i)
+        if match and rng.random() < slang_rate:
+            end, variants = match
+            out.append(rng.choice(variants))
+            i = end
+            continue
+        word = tokens[i]
+        if len(word) > 4 and word.isalpha() and rng.random() < typo_rate:
+            word = _typo(word, rng)
+        out.append(word)
+        i += 1
+    return " ".join(out)
+
+def build_query_corpus(dataset, size=500, seed=0, **perturb_kwargs):
+    """
+    Sample questions from the dataset and perturb them.
+    Returns a list of (query, row position, expected answer), reproducible for a given seed.
+    """
+    rng = random.Random(seed)
+    rows = [rng.randrange(len(dataset)) for _ in range(size)] if len(dataset) else []
+    questions = dataset["question"].tolist()
+    answers = dataset["answer"].tolist()
+    return [(perturb_query(questions[r], rng, **perturb_kwargs), r, answers[r]) for r in rows]
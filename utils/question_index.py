@@ -0,0 +1,29 @@
+from utils.preprocess import preprocess_text
+
+def _key(text):
+    return " ".join(str(text).lower().split())
+
+def build_question_index(questions, answers=None, preprocess=preprocess_text):
+    """
+    Map normalized question text -> first row position, built once at load time.
+    Each question is indexed both as written and after the same preprocessing
+    applied to user queries, so either form of the query hits in O(1).
+    When answers are given, keys shared by rows with different answers are left
+    out, so ambiguous questions go to semantic search instead of an arbitrary row.
+    """
+    index = {}
+    conflicting = set()
+    for row, question in enumerate(questions):
+        if not isinstance(question, str) or not question.strip():
+            continue
+        for key in {_key(question), _key(preprocess(question))}:
+            first = index.setdefault(key, row)
+            if answers is not None and first != row and _key(answers[first]) != _key(answers[row]):
+                conflicting.add(key)
+    for key in conflicting:
+        del index[key]
+    return index
+
+def exact_match(query, question_index):
+    """Return the row position of an exact question match, else None"""
+    return question_index.get(_key(query))
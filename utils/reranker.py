@@ -0,0 +1,137 @@
+import os
+import re
+import threading
+import time
+import numpy as np
+from sentence_transformers import CrossEncoder
+
+from utils.metrics import record_rerank, span
+from utils.response_cache import DISCRIMINATOR_RE
+
+# Second-stage rerankers:
+#   none          - keep the first-stage order
+#   lexical       - prefer candidates that agree with the query's levels, codes, numbers and ordinals
+#   cross-encoder - score (query, question) pairs with a small local cross-encoder
+RERANKERS = ("none", "lexical", "cross-encoder")
+CROSS_ENCODER_MODEL = os.getenv("CRESCENT_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+# Skip the second stage when the first stage already separates its top two by this much
+RERANK_MARGIN = float(os.getenv("CRESCENT_RERANK_MARGIN", 0.05))
+# Per-query time budget; a reranker expected to take longer is skipped
+RERANK_BUDGET_MS = float(os.getenv("CRESCENT_RERANK_BUDGET_MS", 50))
+
+# Lexical reranker: per agreeing / conflicting discriminating token
+AGREE_BONUS = 0.03
+CONFLICT_PENALTY = 0.05
+
+
+# Loaded cross-encoders, shared by every engine (and every hot reload) in the process
+_cross_encoders = {}
+_lock = threading.Lock()
+
+
+def _tokens(text):
+    # "200level" and "csc101" compare equal to "200 level" and "csc 101"
+    text = re.sub(r"(?<=\d)(?=[a-z])|(?<=[a-z])(?=\d)", " ", str(text).lower().replace("-", ""))
+    return set(DISCRIMINATOR_RE.findall(text))
+
+
+class Reranker:
+    """
+    Reorders first-stage candidates for one query.
+    Scores stay the first-stage scores, so the match and fallback thresholds keep
+    their meaning; only which candidate comes first (and so which answer is given)
+    changes. Skipped when the top two candidates are already `margin` apart, when
+    none of them clears `threshold`, or when the expected cost exceeds the budget.
+    """
+
+    kind = "none"
+
+    def __init__(self, margin=None, budget_ms=None):
+        self.margin = RERANK_MARGIN if margin is None else margin
+        self.budget = (RERANK_BUDGET_MS if budget_ms is None else budget_ms) / 1000
+        self._cost = 0.0  # moving average of one _order call, seconds
+
+    def _order(self, query, questions, scores):
+        """Candidate positions, best first"""
+        return np.arange(len(questions))
+
+    def rerank(self, query, scores, ids, questions, threshold=0.0):
+        """Return (scores, ids) reordered; `questions` are the candidates' question texts"""
+        valid = int((ids >= 0).sum())
+        if valid < 2:
+            return scores, ids
+        if scores[0] - scores[1] >= self.margin or scores[0] < threshold - self.margin:
+            record_rerank("skipped_margin")
+            return scores, ids
+        if self._cost > self.budget:
+            record_rerank("skipped_budget")
+            # Let the estimate decay so a transient slowdown doesn't disable reranking for good
+            self._cost *= 0.9
+            return scores, ids
+
+        started = time.perf_counter()
+        with span("rerank"):
+            order = np.asarray(self._order(query, questions[:valid], scores[:valid]))
+        self._cost = 0.8 * self._cost + 0.2 * (time.perf_counter() - started)
+        if order[0] == 0:
+            record_rerank("kept")
+            return scores, ids
+        record_rerank("changed")
+        order = np.concatenate([order, np.arange(valid, len(ids))])
+        return scores[order], ids[order]
+
+
+class LexicalReranker(Reranker):
+    """
+    Nudges candidates by how their discriminating tokens (levels, course codes,
+    numbers, semester ordinals) agree with the query's, so "300 level" picks the
+    300 level sibling over a slightly closer 200 level one.
+    """
+
+    kind = "lexical"
+
+    def _order(self, query, questions, scores):
+        wanted = _tokens(query)
+        if not wanted:
+            return np.arange(len(questions))
+        adjusted = []
+        for question, score in zip(questions, scores):
+            found = _tokens(question)
+            adjusted.append(score + AGREE_BONUS * len(wanted & found) - CONFLICT_PENALTY * len(found - wanted))
+        return np.argsort(-np.array(adjusted), kind="stable")
+
+
+class CrossEncoderReranker(Reranker):
+    """Orders candidates by a local sentence-transformers CrossEncoder's (query, question) relevance"""
+
+    kind = "cross-encoder"
+
+    def __init__(self, model_name=CROSS_ENCODER_MODEL, **kwargs):
+        super().__init__(**kwargs)
+        with _lock:
+            if model_name not in _cross_encoders:
+                model = CrossEncoder(model_name)
+                model.predict([("warm up", "warm up")], show_progress_bar=False)
+                _cross_encoders[model_name] = model
+        self.model = _cross_encoders[model_name]
+
+    def _order(self, query, questions, scores):
+        with _lock:
+            relevance = self.model.predict([(query, q) for q in questions], show_progress_bar=False)
+        return np.argsort(-np.asarray(relevance), kind="stable")
+
+
+def make_reranker(kind=None, **kwargs):
+    """Build the configured reranker (CRESCENT_RERANKER, default lexical); None for "none" """
+    kind = (kind or os.getenv("CRESCENT_RERANKER", "lexical")).lower()
+    if kind not in RERANKERS:
+        raise ValueError(f"Unknown reranker: {kind}")
+    if kind == "none":
+        return None
+    if kind == "cross-encoder":
+        try:
+            return CrossEncoderReranker(**kwargs)
+        except Exception as e:
+            print(f"Could not load the cross-encoder reranker, using lexical: {e}")
+    return LexicalReranker(**kwargs)
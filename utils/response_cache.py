@@ -0,0 +1,137 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+# Tokens that change the answer while barely moving the embedding:
+# levels, course codes and other numbers, and semester ordinals
+DISCRIMINATOR_RE = re.compile(r"\b(?:\w*\d\w*|first|second|third|fourth|fifth)\b")
+
+def _normalize_key(text, scope=None):
+    key = " ".join(str(text).lower().split())
+    return f"{key} |{scope}" if scope else key
+
+def _signature(key):
+    """Sorted discriminating tokens of a normalized key; semantic hits must agree on them"""
+    return tuple(sorted(set(DISCRIMINATOR_RE.findall(key.replace("-", "")))))
+
+
+class ResponseCache:
+    """
+    Two-level answer cache.
+    - exact: LRU keyed by normalized query text
+    - semantic: reuses an answer when a new query embedding lies within
+      `similarity` cosine of a cached one
+    Both levels evict by size (least recently used first) and by TTL.
+    A semantic hit also requires both queries to carry the same levels, course
+    codes, numbers and semester ordinals ("csc 201" must not answer "csc 202").
+    An optional scope (e.g. the department a search was filtered to) is part of
+    the key at both levels.
+    """
+
+    def __init__(self, max_size=2048, semantic_size=512, ttl=3600, similarity=0.95):
+        self.max_size = max_size
+        self.semantic_size = semantic_size
+        self.ttl = ttl
+        self.similarity = similarity
+        self._exact = OrderedDict()      # key -> (expires_at, value)
+        self._semantic = OrderedDict()   # key -> (expires_at, unit embedding, value, signature)
+        self._matrix = None              # stacked semantic embeddings, rebuilt lazily
+        self._matrix_keys = []
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.exact_misses = 0
+        self.semantic_hits = 0
+        self.semantic_misses = 0
+
+    def get(self, query, scope=None):
+        """Exact lookup by normalized query text"""
+        key = _normalize_key(query, scope)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._exact.move_to_end(key)
+                    self.exact_hits += 1
+                    return value
+                del self._exact[key]
+            self.exact_misses += 1
+        return None
+
+    def get_similar(self, embedding, query=None, scope=None):
+        """
+        Semantic lookup; returns the cached value of the closest query within the radius.
+        When query text is given, only entries with the same discriminating tokens match.
+        """
+        signature = (_signature(_normalize_key(query)), scope) if query is not None else None
+        now = time.monotonic()
+        with self._lock:
+            if not self._semantic:
+                self.semantic_misses += 1
+                return None
+            if self._matrix is None:
+                self._matrix_keys = list(self._semantic)
+                self._matrix = np.stack([self._semantic[k][1] for k in self._matrix_keys])
+
+            query = np.asarray(embedding, dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1.0)
+            scores = self._matrix @ query
+            for pos in np.argsort(-scores):
+                if scores[pos] < self.similarity:
+                    break
+                key = self._matrix_keys[pos]
+                expires_at, _, value, entry_signature = self._semantic[key]
+                if expires_at > now and (signature is None or signature == entry_signature):
+                    self._semantic.move_to_end(key)
+                    self.semantic_hits += 1
+                    return value
+            self.semantic_misses += 1
+            return None
+
+    def put(self, query, value, embedding=None, scope=None):
+        """Store a value under the query text and, if given, its embedding"""
+        key = _normalize_key(query, scope)
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._exact[key] = (expires_at, value)
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_size:
+                self._exact.popitem(last=False)
+
+            if embedding is not None:
+                unit = np.asarray(embedding, dtype=np.float32)
+                unit = unit / (np.linalg.norm(unit) or 1.0)
+                self._semantic[key] = (expires_at, unit, value, (_signature(_normalize_key(query)), scope))
+                self._semantic.move_to_end(key)
+                while len(self._semantic) > self.semantic_size:
+                    self._semantic.popitem(last=False)
+                self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._exact.clear()
+            self._semantic.clear()
+            self._matrix = None
+
+    def stats(self):
+        """Hit/miss counters and hit rate per level, and overall"""
+        def level(hits, misses):
+            total = hits + misses
+            return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            # Queries missing both levels; caches used without embeddings only have the exact level
+            semantic_lookups = self.semantic_hits + self.semantic_misses
+            unresolved = self.semantic_misses if semantic_lookups else self.exact_misses
+            return {
+                "exact": level(self.exact_hits, self.exact_misses),
+                "semantic": level(self.semantic_hits, self.semantic_misses),
+                "hit_rate": hits / (hits + unresolved) if hits + unresolved else 0.0,
+                "exact_size": len(self._exact),
+                "semantic_size": len(self._semantic),
+            }
@@ -1,41 +1,217 @@
-import torch
-from sentence_transformers.util import cos_sim
-from utils.embedding import load_model
+import numpy as np
 
-def find_response(user_query, dataset, embeddings, model=None, threshold=0.6):
+from utils.model_registry import get_model
+from utils.vector_index import FlatIndex, _to_numpy
+from utils.metrics import span
+from utils.partitions import filter_scope
+
+NOT_FOUND_RESPONSE = "😕 I’m not sure how to answer that."
+
+FUSION_METHODS = ("weighted", "rrf")
+RRF_K = 60
+
+# Most recent (embeddings, index) pair, so callers that only pass embeddings
+# don't re-normalize the whole corpus on every query
+_default_index = (None, None)
+
+def _index_for(embeddings):
+    global _default_index
+    cached_embeddings, cached_index = _default_index
+    if cached_embeddings is not embeddings:
+        _default_index = (embeddings, FlatIndex(embeddings))
+    return _default_index[1]
+
+def search_batch(queries, model, index, top_k=4):
     """
-    Find the best matching answer to the user_query using cosine similarity.
-    Returns: response (str), department (str or None), score (float), related_questions (list of str)
+    Encode all queries in one model call and search them in one index call.
+    Returns: list of (scores, row_ids) numpy pairs, one per query, best first
     """
+    if not queries:
+        return []
+    with span("encode"):
+        query_embeddings = model.encode(list(queries), convert_to_numpy=True)
+    with span("vector_search"):
+        scores, ids = index.search(query_embeddings, top_k)
+    return list(zip(scores, ids))
 
-    # Load model if not provided
-    if model is None:
-        model = load_model()
-
-    # Encode query
-    query_embedding = model.encode(user_query, convert_to_tensor=True)
-    cosine_scores = cos_sim(query_embedding, embeddings)[0]
+def _build_response(dataset, scores, ids, threshold):
+    if len(ids) == 0 or ids[0] < 0:
+        return NOT_FOUND_RESPONSE, None, 0.0, []
 
-    # Get best match
-    best_score = torch.max(cosine_scores).item()
-    best_idx = torch.argmax(cosine_scores).item()
+    best_idx = int(ids[0])
+    best_score = float(scores[0])
 
     # If below threshold, return fallback
     if best_score < threshold:
-        return "😕 I’m not sure how to answer that.", None, best_score, []
+        return NOT_FOUND_RESPONSE, None, best_score, []
 
     # Retrieve best matching row
     best_row = dataset.iloc[best_idx]
     response = best_row["answer"]
     department = best_row.get("department", None)
 
-    # Get top 4 related (excluding top one)
-    top_k = torch.topk(cosine_scores, k=4)
+    # Remaining hits are related questions (excluding top one)
     top_related = []
-    for idx in top_k.indices.tolist():
-        if idx != best_idx:
-            question = dataset.iloc[idx]["question"]
-            if question not in top_related:
-                top_related.append(question)
+    for idx in ids[1:].tolist():
+        if idx < 0 or idx == best_idx:
+            continue
+        question = dataset.iloc[idx]["question"]
+        if question not in top_related:
+            top_related.append(question)
 
     return response, department, best_score, top_related
+
+def _fuse(query, query_embedding, scores, ids, embeddings, lexical, top_k, fusion, lexical_weight, allowed=None):
+    """
+    Merge vector hits with BM25 hits for one query.
+    Every candidate gets both its cosine and its normalized BM25 score. The reported
+    score is their soft-OR, 1 - (1 - cos)(1 - w * bm25): never below the cosine alone,
+    and lifted when the exact tokens (course codes, acronyms, amounts) match.
+    fusion="weighted" ranks by that score, "rrf" by reciprocal rank fusion.
+    `allowed` (a row mask) keeps lexical candidates inside a metadata slice.
+    """
+    lexical_scores = lexical.scores(query)
+    if allowed is not None:
+        lexical_scores = np.where(allowed, lexical_scores, 0)
+    lexical_top = np.argsort(-lexical_scores)[:top_k]
+    lexical_top = lexical_top[lexical_scores[lexical_top] > 0]
+
+    vector_hits = {int(i): float(s) for s, i in zip(scores, ids) if i >= 0}
+    candidates = list(vector_hits) + [int(i) for i in lexical_top if int(i) not in vector_hits]
+    if not candidates:
+        return scores, ids
+
+    missing = [i for i in candidates if i not in vector_hits]
+    if missing:
+        # Cosines for rows only the lexical side found
+        rows = _to_numpy(embeddings[missing])
+        rows = rows / np.linalg.norm(rows, axis=1, keepdims=True).clip(min=1e-12)
+        q = _to_numpy(query_embedding).reshape(-1)
+        q = q / (np.linalg.norm(q) or 1.0)
+        vector_hits.update(zip(missing, (rows @ q).tolist()))
+
+    cosines = np.array([vector_hits[i] for i in candidates], dtype=np.float32)
+    lexical_part = lexical_scores[candidates]
+    fused = 1 - (1 - np.clip(cosines, 0, 1)) * (1 - lexical_weight * lexical_part)
+
+    if fusion == "rrf":
+        cosine_rank = np.argsort(np.argsort(-cosines))
+        lexical_rank = np.argsort(np.argsort(-lexical_part))
+        order = np.argsort(-(1 / (RRF_K + cosine_rank) + 1 / (RRF_K + lexical_rank)))
+    else:
+        order = np.argsort(-fused)
+    order = order[:top_k]
+    return fused[order], np.array(candidates, dtype=np.int64)[order]
+
+def lexical_responses(user_queries, dataset, lexical, threshold=0.6, top_k=4):
+    """Answer from the BM25 index alone (e.g. while the embedding model is still loading)"""
+    with span("lexical_search"):
+        scores, ids = lexical.search(list(user_queries), top_k)
+    return [_build_response(dataset, s, i, threshold) for s, i in zip(scores, ids)]
+
+def find_responses(user_queries, dataset, embeddings, model=None, threshold=0.6, index=None, top_k=4, cache=None,
+                   cache_levels=None, lexical=None, fusion="weighted", lexical_weight=0.5, partitions=None,
+                   filters=None, reranker=None):
+    """
+    Batched find_response: one encode call and one similarity search for all queries.
+    With a ResponseCache, exact and near-duplicate queries are answered from the cache
+    and only the remaining queries are encoded/searched. If cache_levels is a list, it
+    receives the cache level that answered each query ("exact", "semantic" or None).
+    With a BM25Index as `lexical`, vector hits are fused with lexical hits (see _fuse).
+    With MetadataPartitions and per-query `filters` (canonical dicts, see
+    partitions.normalize_filters), a pinned query scans only its slice, and the whole
+    corpus only if nothing in the slice clears the threshold.
+    A Reranker reorders each query's candidates as a second stage (see utils/reranker.py).
+    Returns: list of (response, department, score, related_questions) tuples
+    """
+    if not user_queries:
+        return []
+
+    # Use the shared model if not provided
+    if model is None:
+        model = get_model()
+
+    if index is None:
+        index = _index_for(embeddings)
+
+    filters = filters if filters is not None and partitions is not None else [None] * len(user_queries)
+    scopes = [filter_scope(f) for f in filters]
+
+    def search(positions, query_embeddings):
+        """Vector search for the queries at `positions`; returns (scores, ids, allowed mask) each"""
+        found = [None] * len(positions)
+        unfiltered = []
+        for j, i in enumerate(positions):
+            sliced = None
+            if filters[i]:
+                with span("partition_search"):
+                    sliced = partitions.search(query_embeddings[j:j + 1], filters[i], top_k)
+            if sliced is not None and len(sliced[0][0]) and sliced[0][0][0] >= threshold:
+                scores, ids, allowed = sliced
+                found[j] = (scores[0], ids[0], allowed)
+            else:
+                unfiltered.append(j)
+        if unfiltered:
+            with span("vector_search"):
+                scores, ids = index.search(np.stack([query_embeddings[j] for j in unfiltered]), top_k)
+            for j, row_scores, row_ids in zip(unfiltered, scores, ids):
+                found[j] = (row_scores, row_ids, None)
+        return found
+
+    def build(i, scores, ids, allowed, query_embedding):
+        if lexical is not None:
+            with span("fusion"):
+                scores, ids = _fuse(user_queries[i], query_embedding, scores, ids, embeddings, lexical,
+                                    top_k, fusion, lexical_weight, allowed)
+        if reranker is not None:
+            questions = [dataset.iloc[int(row)]["question"] for row in ids if row >= 0]
+            scores, ids = reranker.rerank(user_queries[i], scores, ids, questions, threshold)
+        return _build_response(dataset, scores, ids, threshold)
+
+    if cache is None:
+        with span("encode"):
+            query_embeddings = model.encode(list(user_queries), convert_to_numpy=True)
+        positions = list(range(len(user_queries)))
+        return [
+            build(i, *found, query_embeddings[i])
+            for i, found in zip(positions, search(positions, query_embeddings))
+        ]
+
+    results = [cache.get(query, scope) for query, scope in zip(user_queries, scopes)]
+    pending = [i for i, result in enumerate(results) if result is None]
+    levels = [None if result is None else "exact" for result in results]
+    if cache_levels is not None:
+        # Filled in place, so entries set below are visible to the caller
+        cache_levels[:] = levels
+        levels = cache_levels
+    if not pending:
+        return results
+
+    with span("encode"):
+        query_embeddings = model.encode([user_queries[i] for i in pending], convert_to_numpy=True)
+    misses = []
+    for i, query_embedding in zip(pending, query_embeddings):
+        hit = cache.get_similar(query_embedding, user_queries[i], scopes[i])
+        if hit is not None:
+            results[i] = hit
+            levels[i] = "semantic"
+            cache.put(user_queries[i], hit, scope=scopes[i])
+        else:
+            misses.append((i, query_embedding))
+
+    if misses:
+        miss_embeddings = np.stack([emb for _, emb in misses])
+        found = search([i for i, _ in misses], miss_embeddings)
+        for (i, query_embedding), hit in zip(misses, found):
+            results[i] = build(i, *hit, query_embedding)
+            cache.put(user_queries[i], results[i], query_embedding, scopes[i])
+
+    return results
+
+def find_response(user_query, dataset, embeddings, model=None, threshold=0.6, index=None, top_k=4, cache=None):
+    """
+    Find the best matching answer to the user_query using cosine similarity.
+    The best match and the related questions come from a single top_k index query.
+    Returns: response (str), department (str or None), score (float), related_questions (list of str)
+    """
+    return find_responses([user_query], dataset, embeddings, model, threshold, index, top_k, cache)[0]
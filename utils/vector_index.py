@@ -0,0 +1,250 @@
+import os
+import tempfile
+import numpy as np
+import torch
+
+try:
+    import faiss
+except ImportError:  # faiss-cpu is optional; exact search works without it
+    faiss = None
+
+INDEX_DIR = "data/cache"
+INDEX_KINDS = ("auto", "flat", "float16", "int8", "ivf", "hnsw")
+
+# Above this many vectors "auto" switches from exact search to HNSW
+AUTO_ANN_THRESHOLD = 50_000
+
+def _to_numpy(vectors):
+    """Return a contiguous float32 numpy array from a tensor or array"""
+    if isinstance(vectors, torch.Tensor):
+        vectors = vectors.detach().cpu().numpy()
+    return np.ascontiguousarray(np.atleast_2d(vectors), dtype=np.float32)
+
+def _normalize(vectors):
+    """L2-normalize rows so inner product equals cosine similarity"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    if np.allclose(norms, 1.0, atol=1e-4):
+        # Already unit length (MiniLM normalizes): keep the array, and any shared mapping, as is
+        return vectors
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class FlatIndex:
+    """Exact cosine-similarity index backed by a single numpy matrix multiply"""
+
+    kind = "flat"
+
+    def __init__(self, embeddings):
+        self.vectors = _normalize(_to_numpy(embeddings))
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, queries, k):
+        """
+        Return the k most similar rows for each query.
+        Returns: scores (n_queries, k) and row ids (n_queries, k), best first
+        """
+        queries = _normalize(_to_numpy(queries))
+        k = min(k, len(self.vectors))
+        if k == 0:
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.float32), empty.astype(np.int64)
+
+        scores = queries @ self.vectors.T
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(scores.shape[1]), (len(queries), 1))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+class QuantizedIndex:
+    """
+    Exact-scan index over a float16 or int8 (per-dimension scalar-quantized) copy
+    of the vectors, with the best candidates re-ranked against the float32 vectors.
+    Only the compact copy is scanned; when the float32 embeddings are the cache's
+    file mapping, just the candidate rows are ever paged in.
+    """
+
+    def __init__(self, embeddings, dtype="int8", rerank=4, chunk_size=16384):
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"Unknown storage dtype: {dtype}")
+        self.kind = dtype
+        self.rerank = rerank
+        self.chunk_size = chunk_size
+        self.reference = _normalize(_to_numpy(embeddings))
+        if dtype == "float16":
+            self.scale = None
+            self.codes = self.reference.astype(np.float16)
+        else:
+            # Symmetric per-dimension scale so the largest value of each dimension maps to 127
+            self.scale = np.abs(self.reference).max(axis=0) / 127 if len(self.reference) else np.ones(self.reference.shape[1], np.float32)
+            self.scale[self.scale == 0] = 1.0
+            self.codes = np.clip(np.rint(self.reference / self.scale), -127, 127).astype(np.int8)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        """Resident size of the scanned copy"""
+        return self.codes.nbytes
+
+    def _approximate_scores(self, queries):
+        if self.scale is not None:
+            # (q * s) . c == q . (s * c), so the scale folds into the query
+            queries = queries * self.scale
+        scores = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        for start in range(0, len(self.codes), self.chunk_size):
+            chunk = self.codes[start:start + self.chunk_size].astype(np.float32)
+            scores[:, start:start + len(chunk)] = queries @ chunk.T
+        return scores
+
+    def search(self, queries, k):
+        """
+        Return the k most similar rows for each query.
+        Returns: scores (n_queries, k) and row ids (n_queries, k), best first
+        """
+        queries = _normalize(_to_numpy(queries))
+        k = min(k, len(self))
+        if k == 0:
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.float32), empty.astype(np.int64)
+
+        approximate = self._approximate_scores(queries)
+        n_candidates = min(len(self), k * self.rerank)
+        if n_candidates < len(self):
+            candidates = np.argpartition(-approximate, n_candidates - 1, axis=1)[:, :n_candidates]
+        else:
+            candidates = np.tile(np.arange(len(self)), (len(queries), 1))
+
+        # Precise float32 scores for the candidates only
+        exact = np.einsum("qd,qcd->qc", queries, self.reference[candidates])
+        order = np.argsort(-exact, axis=1)[:, :k]
+        return np.take_along_axis(exact, order, axis=1), np.take_along_axis(candidates, order, axis=1).astype(np.int64)
+
+
+class FaissIndex:
+    """Approximate (IVF/HNSW) or exact faiss index over normalized vectors"""
+
+    def __init__(self, index, kind):
+        self.index = index
+        self.kind = kind
+
+    def __len__(self):
+        return self.index.ntotal
+
+    @classmethod
+    def build(cls, embeddings, kind="hnsw", nlist=None, nprobe=8, hnsw_m=32, ef_search=64):
+        vectors = _normalize(_to_numpy(embeddings))
+        n, dim = vectors.shape
+
+        if kind == "flat":
+            index = faiss.IndexFlatIP(dim)
+        elif kind == "ivf":
+            nlist = nlist or max(1, int(np.sqrt(n)))
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+            index.nprobe = min(nprobe, nlist)
+        elif kind == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efSearch = ef_search
+        else:
+            raise ValueError(f"Unknown index kind: {kind}")
+
+        index.add(vectors)
+        return cls(index, kind)
+
+    def save(self, path):
+        # Unique temp name: concurrent processes may persist the same index at once
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        os.close(fd)
+        try:
+            faiss.write_index(self.index, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, kind, mmap=True):
+        """Load a persisted index; mmap shares its pages between processes where faiss supports it"""
+        if mmap:
+            try:
+                return cls(faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY), kind)
+            except RuntimeError:
+                pass
+        return cls(faiss.read_index(path), kind)
+
+    def search(self, queries, k):
+        """
+        Return the k most similar rows for each query.
+        Returns: scores (n_queries, k) and row ids (n_queries, k), best first
+        """
+        queries = _normalize(_to_numpy(queries))
+        k = min(k, len(self))
+        if k == 0:
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.float32), empty.astype(np.int64)
+        scores, ids = self.index.search(queries, k)
+        return scores, ids
+
+
+def _index_filename(kind, cache_key, n, params):
+    """File name for a persisted index, covering every parameter that shapes it"""
+    if kind == "ivf":
+        nlist = params.get("nlist") or max(1, int(np.sqrt(n)))
+        tag = f"nlist{nlist}-nprobe{params.get('nprobe', 8)}"
+    elif kind == "hnsw":
+        tag = f"m{params.get('hnsw_m', 32)}-ef{params.get('ef_search', 64)}"
+    else:
+        tag = "exact"
+    return f"{kind}-{tag}-{cache_key}.faiss"
+
+def build_index(embeddings, kind="auto", cache_key=None, index_dir=INDEX_DIR, **params):
+    """
+    Build a vector index over question embeddings.
+    kind: "flat" (exact), "float16"/"int8" (compact exact scan with float32 re-rank), "ivf", "hnsw"
+    or "auto" (exact for small corpora, HNSW for large ones).
+    When cache_key is given, faiss indexes are persisted under index_dir and reloaded on restart.
+    """
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind: {kind}")
+
+    if kind == "auto":
+        kind = "hnsw" if len(embeddings) >= AUTO_ANN_THRESHOLD else "flat"
+
+    if kind in ("float16", "int8"):
+        return QuantizedIndex(embeddings, dtype=kind, **params)
+
+    if kind == "flat" or faiss is None:
+        if kind != "flat":
+            print(f"faiss is not installed, falling back to exact search instead of '{kind}'")
+        return FlatIndex(embeddings)
+
+    path = os.path.join(index_dir, _index_filename(kind, cache_key, len(embeddings), params)) if cache_key else None
+    if path and os.path.exists(path):
+        try:
+            return FaissIndex.load(path, kind)
+        except RuntimeError as e:
+            print(f"Could not load persisted index {path}: {e}")
+
+    index = FaissIndex.build(embeddings, kind=kind, **params)
+    if path:
+        os.makedirs(index_dir, exist_ok=True)
+        index.save(path)
+    return index
+
+
+def recall_at_k(index, embeddings, queries, k=4):
+    """Fraction of the exact cosine top-k neighbours of each query that the index also returns"""
+    _, expected = FlatIndex(embeddings).search(queries, k)
+    _, found = index.search(queries, k)
+    hits = sum(len(set(e.tolist()) & set(f.tolist())) for e, f in zip(expected, found))
+    return hits / expected.size if expected.size else 1.0
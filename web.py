@@ -3,25 +3,14 @@
 import streamlit as st
 import os
 import uuid
-import openai
 from dotenv import load_dotenv
 
-from utils.embedding import load_model, load_dataset, compute_question_embeddings
-from utils.preprocess import preprocess_text
-from utils.search import find_response
 from utils.memory import init_memory
-from utils.log_utils import log_query
-from utils.course_query import extract_course_query  # for extracting level/semester
-from utils.conversations import (
-    is_greeting,
-    get_greeting_response,
-    get_social_response,
-    default_response,
-)
+from utils.hot_reload import open_engine
+from utils.api_client import RemoteEngine
 
 # --- Load Environment Variables ---
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
 # --- Page Settings ---
 st.set_page_config(page_title="Crescent University Chatbot", page_icon="🎓")
@@ -38,15 +27,16 @@ if "last_query_info" not in st.session_state:
 
 init_memory()
 
-# --- Load Model & Dataset ---
+# --- Answer Engine ---
+# In-process by default; set CRESCENT_API_URL to use a running server.py instead
 @st.cache_resource
-def load_bot_resources():
-    model = load_model()
-    data = load_dataset()
-    embeddings = compute_question_embeddings(data["question"].tolist(), model)
-    return model, data, embeddings
+def load_engine():
+    api_url = os.getenv("CRESCENT_API_URL")
+    if api_url:
+        return RemoteEngine(api_url)
+    return open_engine()
 
-model, dataset, question_embeddings = load_bot_resources()
+engine = load_engine()
 
 # --- Sidebar ---
 with st.sidebar:
@@ -126,99 +116,21 @@ if st.session_state["last_query_info"]:
             unsafe_allow_html=True,
         )
 
-# --- Define follow-up detection ---
-def is_follow_up(text):
-    triggers = ["what about", "how about", "and", "also", "okay", "now", "then", "continue", "next"]
-    return any(phrase in text.lower() for phrase in triggers)
-
 # --- User Input ---
 user_input = st.chat_input("Ask me anything about Crescent University...")
 
 if user_input:
     st.session_state.chat_history.append({"role": "user", "content": user_input})
 
-    # ✅ Greeting check
-    if is_greeting(user_input):
-        response = get_greeting_response()
-        st.session_state.chat_history.append({"role": "assistant", "content": response})
-        st.rerun()
-
-    # ✅ Social / small-talk check
-    social = get_social_response(user_input)
-    if social:
-        st.session_state.chat_history.append({"role": "assistant", "content": social})
-        st.rerun()
-
-    # --- Extract query info ---
-    query_info = extract_course_query(user_input)
-    extracted_level = query_info.get("level")
-    extracted_semester = query_info.get("semester")
-    extracted_department = query_info.get("department")
-
-    # --- If follow-up, enrich query with memory ---
-    if is_follow_up(user_input) and st.session_state["last_query_info"]:
-        prev = st.session_state["last_query_info"]
-        enriched_input = f"{user_input} in {prev.get('department', '')}"
-        if prev.get("level") and "level" not in user_input:
-            enriched_input += f" {prev['level']} level"
-        if prev.get("semester") and "semester" not in user_input:
-            enriched_input += f", {prev['semester']} semester"
-        cleaned_input = preprocess_text(enriched_input)
-    else:
-        cleaned_input = preprocess_text(user_input)
-
-    # --- Try direct match first ---
-    matched_row = dataset[dataset['question'].str.lower() == cleaned_input.lower()]
-    if not matched_row.empty:
-        response = matched_row.iloc[0]['answer']
-        department = extracted_department
-        related = []
-        score = 1.0
-    else:
-        response, department, score, related = find_response(cleaned_input, dataset, question_embeddings)
-
-        # --- GPT-4 fallback ---
-        if score < 0.65 or not response.strip():
-            try:
-                gpt_reply = openai.ChatCompletion.create(
-                    model="gpt-4",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are a helpful assistant for Crescent University. Answer only based on the university's academic programs, departments, and policies.",
-                        },
-                        {"role": "user", "content": user_input},
-                    ],
-                    temperature=0.7,
-                    max_tokens=300,
-                )
-                response = gpt_reply["choices"][0]["message"]["content"]
-                department = extracted_department
-                related = []
-                response += "\n\n🧠 _This response was generated by GPT-4 fallback._"
-            except Exception as e:
-                response = default_response()
-                print(f"GPT-4 Fallback Error: {e}")
-
-    # --- Ensure fallback personality if no response ---
-    if not response.strip():
-        response = default_response()
+    result = engine.answer(user_input, st.session_state["last_query_info"] or None)
 
     # --- Store to memory ---
-    st.session_state["last_query_info"] = {
-        "query": user_input,
-        "response": response,
-        "department": extracted_department or department,
-        "level": extracted_level,
-        "semester": extracted_semester,
-        "score": score,
-    }
-
-    st.session_state.chat_history.append({"role": "assistant", "content": response})
-    st.session_state.related_questions = related
-    st.session_state.last_department = department
+    if result["query_info"] is not None:
+        st.session_state["last_query_info"] = result["query_info"]
+        st.session_state.related_questions = result["related"]
+        st.session_state.last_department = result["department"]
 
-    log_query(user_input, score)
+    st.session_state.chat_history.append({"role": "assistant", "content": result["response"]})
     st.rerun()
 
 # --- Follow-Up Suggestions ---
@@ -227,32 +139,9 @@ if st.session_state.related_questions:
     for i, q in enumerate(st.session_state.related_questions):
         if st.button(q, key=f"related_{i}", use_container_width=True):
             st.session_state.chat_history.append({"role": "user", "content": q})
-            response, department, score, related = find_response(q, dataset, question_embeddings)
-
-            if score < 0.65 or not response.strip():
-                try:
-                    gpt_reply = openai.ChatCompletion.create(
-                        model="gpt-4",
-                        messages=[
-                            {
-                                "role": "system",
-                                "content": "You are a helpful assistant for Crescent University. Answer only based on the university's academic programs, departments, and policies.",
-                            },
-                            {"role": "user", "content": q},
-                        ],
-                        temperature=0.7,
-                        max_tokens=300,
-                    )
-                    response = gpt_reply["choices"][0]["message"]["content"]
-                    department = None
-                    related = []
-                    response += "\n\n🧠 _This response was generated by GPT-4 fallback._"
-                except Exception as e:
-                    response = default_response()
-                    print(f"GPT-4 Related Fallback Error: {e}")
+            result = engine.answer(q)
 
-            st.session_state.chat_history.append({"role": "assistant", "content": response})
-            st.session_state.related_questions = related
-            st.session_state.last_department = department
-            log_query(q, score)
+            st.session_state.chat_history.append({"role": "assistant", "content": result["response"]})
+            st.session_state.related_questions = result["related"]
+            st.session_state.last_department = result["department"]
             st.rerun()